@@ -0,0 +1,56 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the PCM processing chain.
+
+Runs 20 ms stereo frames through the full chain (EQ, compressor, gain with
+a pending ramp and limiter) and reports the per-frame cost.
+
+Usage: python benchmarks/dsp_benchmark.py [frames]
+"""
+
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.dsp import CHANNELS, SAMPLE_RATE, DSPChain, Gain
+
+FRAME_SAMPLES = SAMPLE_RATE // 50
+
+def main():
+    frames = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = np.random.default_rng(0)
+    pcm = [
+        (rng.standard_normal(FRAME_SAMPLES * CHANNELS) * 8000).astype(np.int16).tobytes()
+        for _ in range(64)
+    ]
+    
+    chain = DSPChain.create(volume=1.5, eq=(6.0, -3.0, 4.0), compress=True)
+    gain = chain.get(Gain)
+    
+    # Warm up FFT plans and caches
+    for frame in pcm:
+        chain.process(frame)
+    
+    timings = np.empty(frames)
+    for i in range(frames):
+        if i % 100 == 0:
+            # Keep the gain ramp busy so its slow path is measured too
+            gain.target = 0.5 if gain.target > 1 else 1.5
+        start = time.perf_counter()
+        chain.process(pcm[i % len(pcm)])
+        timings[i] = time.perf_counter() - start
+    
+    timings *= 1e6
+    print(f"Full DSP chain, {frames} frames of 20 ms")
+    print(f"  mean: {timings.mean():8.1f} us")
+    print(f"  p50:  {np.percentile(timings, 50):8.1f} us")
+    print(f"  p99:  {np.percentile(timings, 99):8.1f} us")
+    print(f"  max:  {timings.max():8.1f} us")
+    print(f"  budget used: {timings.mean() / 20000:.2%} of real time")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+"""
+Benchmark for the music queue.
+
+Fills a queue with 10k and 100k tracks and times the common operations
+against a plain list with pop(0), which is what the queue used to be.
+
+Usage: python benchmarks/queue_benchmark.py [sizes...]
+"""
+
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bot.music_queue import MusicQueue
+from bot.track import Track
+
+OPERATIONS = 1000
+
+def make_tracks(count):
+    return [
+        Track(f"song {i}", id=f"{i:011d}", title=f"Song {i}", duration=180 + i % 120,
+              webpage_url=f"https://www.youtube.com/watch?v={i:011d}")
+        for i in range(count)
+    ]
+
+def timed(label, operation, repeat=OPERATIONS):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        operation()
+    elapsed = (time.perf_counter() - start) / repeat
+    print(f"  {label:<28} {elapsed * 1e6:10.2f} us/op")
+
+def bench(size):
+    rng = random.Random(0)
+    tracks = make_tracks(size)
+    
+    tracemalloc.start()
+    stored = make_tracks(size)
+    memory, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del stored
+    
+    print(f"{size} tracks ({memory / size:.0f} bytes per track record)")
+    
+    baseline = list(tracks)
+    timed("list pop(0) advance", lambda: baseline.append(baseline.pop(0)))
+    timed("list remove + insert, random", lambda: baseline.insert(rng.randrange(size), baseline.pop(rng.randrange(size))))
+    
+    queue = MusicQueue()
+    for track in tracks:
+        queue.add(track)
+    queue.loop_queue = True
+    
+    timed("advance (loop queue)", queue.get_next)
+    timed("enqueue + remove last", lambda: (queue.add(tracks[0]), queue.remove(-1)))
+    timed("remove + insert, random", lambda: queue.insert(rng.randrange(size), queue.remove(rng.randrange(size))))
+    timed("move to front, random", lambda: queue.move(rng.randrange(size), 0))
+    timed("upcoming(3)", lambda: queue.upcoming(3))
+    timed("shuffle", queue.shuffle, repeat=10)
+    print()
+
+def main():
+    sizes = [int(size) for size in sys.argv[1:]] or [10_000, 100_000]
+    for size in sizes:
+        bench(size)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,289 @@
+"""
+Audio source wrappers for the music module.
+"""
+
+import logging
+import threading
+import weakref
+from collections import deque
+from typing import Any, Callable, Optional
+
+import discord
+import numpy as np
+
+from .config import Config
+from .dsp import DSPChain, Gain, array_to_frame, frame_to_array
+
+logger = logging.getLogger(__name__)
+
+# Duration of one audio frame sent to Discord
+FRAME_SECONDS = 0.02
+
+# Frames sent in place of audio when the buffer runs dry
+PCM_SILENCE = b'\0' * discord.opus.Encoder.FRAME_SIZE
+OPUS_SILENCE = b'\xf8\xff\xfe'
+
+class BufferedSource(discord.AudioSource):
+    """Read-ahead jitter buffer around another audio source.
+    
+    A background thread reads frames from the wrapped source into a bounded
+    ring buffer, so stalls in FFmpeg or the upstream HTTP stream are absorbed
+    instead of stuttering the 20 ms send cadence. When the buffer runs dry a
+    silent frame is sent and the underrun is counted.
+    """
+    
+    # Underruns across every buffered source, for metrics
+    total_underruns = 0
+    # Buffered sources that have not been cleaned up yet
+    live: 'weakref.WeakSet[BufferedSource]' = weakref.WeakSet()
+    
+    def __init__(self, original: discord.AudioSource, *, depth: Optional[float] = None):
+        depth = depth if depth is not None else Config.JITTER_BUFFER_SECONDS
+        self.original = original
+        self.capacity = max(int(depth / FRAME_SECONDS), 1)
+        self.frames_buffered: deque = deque()
+        # Real frames handed out, not counting silence sent during underruns
+        self.frames = 0
+        self.underruns = 0
+        self.ended = False
+        # Set once the first real frame was handed out
+        self.started = False
+        self._closed = False
+        self._silence = OPUS_SILENCE if original.is_opus() else PCM_SILENCE
+        self._condition = threading.Condition()
+        self._thread = threading.Thread(target=self._fill, name='audio-buffer', daemon=True)
+        self._thread.start()
+        BufferedSource.live.add(self)
+    
+    @property
+    def buffered(self) -> float:
+        """Seconds of audio currently buffered."""
+        return len(self.frames_buffered) * FRAME_SECONDS
+    
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+    
+    def _fill(self):
+        """Keep the buffer topped up from the wrapped source."""
+        try:
+            while True:
+                with self._condition:
+                    while len(self.frames_buffered) >= self.capacity and not self._closed:
+                        self._condition.wait()
+                    if self._closed:
+                        return
+                
+                data = self.original.read()
+                
+                with self._condition:
+                    if not data:
+                        return
+                    self.frames_buffered.append(data)
+                    self._condition.notify_all()
+        except Exception as e:
+            if not self._closed:
+                logger.error(f"Error reading audio into buffer: {e}")
+        finally:
+            with self._condition:
+                self.ended = True
+                self._condition.notify_all()
+    
+    def read(self) -> bytes:
+        with self._condition:
+            if not self.frames_buffered and not self.ended:
+                self._condition.wait(FRAME_SECONDS)
+            
+            if self.frames_buffered:
+                self.started = True
+                self.frames += 1
+                data = self.frames_buffered.popleft()
+                self._condition.notify_all()
+                return data
+            
+            if self.ended:
+                return b''
+            
+            # Silence before the first frame is startup latency, not an underrun
+            if self.started:
+                self.underruns += 1
+                BufferedSource.total_underruns += 1
+            return self._silence
+    
+    def cleanup(self):
+        with self._condition:
+            self._closed = True
+            self.frames_buffered.clear()
+            self._condition.notify_all()
+        BufferedSource.live.discard(self)
+        self.original.cleanup()
+
+def ffmpeg_process_count() -> int:
+    """Count FFmpeg processes still running behind buffered sources."""
+    return sum(
+        1 for source in list(BufferedSource.live)
+        if getattr(source.original, '_process', None) and source.original._process.poll() is None
+    )
+
+class ProcessedSource(discord.AudioSource):
+    """PCM source run through a DSP chain; replaces discord.PCMVolumeTransformer."""
+    
+    def __init__(self, original: discord.AudioSource, chain: Optional[DSPChain] = None):
+        if original.is_opus():
+            raise discord.ClientException('ProcessedSource needs a PCM source, not Opus.')
+        self.original = original
+        self.chain = chain or DSPChain.create()
+    
+    @property
+    def volume(self) -> float:
+        """Target gain of the chain; changes are ramped in smoothly."""
+        gain = self.chain.get(Gain)
+        return gain.target if gain else 1.0
+    
+    @volume.setter
+    def volume(self, value: float):
+        gain = self.chain.get(Gain)
+        if gain:
+            gain.target = max(value, 0.0)
+    
+    def read(self) -> bytes:
+        return self.chain.process(self.original.read())
+    
+    def cleanup(self):
+        self.original.cleanup()
+
+class GaplessSource(discord.AudioSource):
+    """Plays tracks back to back without a gap between them.
+    
+    A few seconds before the current source ends, `on_preopen` is called so
+    the next source can be opened ahead of time with `set_next`. The switch
+    then happens inside `read`, on the exact frame the current source runs
+    out, optionally crossfading the two. `on_transition` is called with the
+    new track after every switch, and `on_first_frame` once the first real
+    audio frame is sent. All callbacks run on the audio thread.
+    """
+    
+    def __init__(self, source: discord.AudioSource, track: Any, *,
+                 on_preopen: Callable[[], None], on_transition: Callable[[Any], None],
+                 on_first_frame: Optional[Callable[[], None]] = None,
+                 preopen: Optional[float] = None, crossfade: Optional[float] = None):
+        self.current = source
+        self.track = track
+        self.next: Optional[discord.AudioSource] = None
+        self.next_track: Any = None
+        self.on_preopen = on_preopen
+        self.on_transition = on_transition
+        self.on_first_frame = on_first_frame
+        self.preopen = preopen if preopen is not None else Config.GAPLESS_PREOPEN
+        self.crossfade = crossfade if crossfade is not None else Config.CROSSFADE_SECONDS
+        self._requested = False
+        self._closed = False
+        self._lock = threading.RLock()
+        # discord.py only creates an encoder if playback starts with PCM
+        self._opus = source.is_opus()
+        self._encoder: Optional[discord.opus.Encoder] = None
+    
+    def is_opus(self) -> bool:
+        return self._opus or self.current.is_opus()
+    
+    def remaining(self) -> Optional[float]:
+        """Seconds left in the current track, if its duration is known."""
+        position = getattr(self.current, 'position', None)
+        duration = getattr(self.track, 'duration', None)
+        if position is None or not duration:
+            return None
+        return duration - position
+    
+    def wants_next(self) -> bool:
+        """Check if the current track is close enough to its end to open the next one."""
+        remaining = self.remaining()
+        return self.next is None and remaining is not None and remaining <= self.preopen
+    
+    def set_next(self, source: discord.AudioSource, track: Any):
+        """Queue an already opened source to follow the current one."""
+        with self._lock:
+            if self._closed:
+                # Playback already ended; don't leak the FFmpeg process
+                source.cleanup()
+                return
+            self.discard_next()
+            self.next = source
+            self.next_track = track
+    
+    def discard_next(self):
+        """Drop the pre-opened next source, e.g. after the queue changed."""
+        with self._lock:
+            if self.next:
+                self.next.cleanup()
+            self.next = None
+            self.next_track = None
+            self._requested = False
+    
+    def replace_current(self, source: discord.AudioSource):
+        """Swap the current source in place, keeping the same track."""
+        with self._lock:
+            old_source = self.current
+            self.current = source
+        old_source.cleanup()
+    
+    def read(self) -> bytes:
+        with self._lock:
+            if not self._requested and self.wants_next():
+                self._requested = True
+                self.on_preopen()
+            
+            remaining = self.remaining()
+            if (self.next and self.crossfade > 0 and remaining is not None and remaining <= self.crossfade
+                    and not self.current.is_opus() and not self.next.is_opus()):
+                data = self._mix(max(remaining, 0) / self.crossfade)
+            else:
+                data = self.current.read()
+            
+            if not data and self.next:
+                self._switch()
+                data = self.current.read()
+            
+            if data and self.on_first_frame and getattr(self.current, 'started', True):
+                callback, self.on_first_frame = self.on_first_frame, None
+                callback()
+            
+            if data and self._opus and not self.current.is_opus():
+                if self._encoder is None:
+                    self._encoder = discord.opus.Encoder()
+                data = self._encoder.encode(data, self._encoder.SAMPLES_PER_FRAME)
+            return data
+    
+    def _mix(self, level: float) -> bytes:
+        """Mix one frame of the current and next sources, fading from one to the other."""
+        current = self.current.read()
+        upcoming = self.next.read()
+        if not current:
+            # The current track ended early; keep what the next one already played
+            self._switch()
+            return upcoming
+        
+        size = max(len(current), len(upcoming))
+        current = frame_to_array(current.ljust(size, b'\0'))
+        upcoming = frame_to_array(upcoming.ljust(size, b'\0'))
+        # Ramp across the frame towards the next frame's level
+        step = FRAME_SECONDS / self.crossfade
+        fade = np.linspace(level, max(level - step, 0), len(current), endpoint=False, dtype=np.float32)[:, None]
+        return array_to_frame(current * fade + upcoming * (1 - fade))
+    
+    def _switch(self):
+        """Make the pre-opened source current."""
+        self.current.cleanup()
+        self.current = self.next
+        self.track = self.next_track
+        self.next = None
+        self.next_track = None
+        self._requested = False
+        try:
+            self.on_transition(self.track)
+        except Exception as e:
+            logger.error(f"Error in track transition callback: {e}")
+    
+    def cleanup(self):
+        with self._lock:
+            self._closed = True
+            self.current.cleanup()
+            self.discard_next()
@@ -0,0 +1,192 @@
+"""
+Shared audio fan-out for the music module.
+
+When many guilds play the same track at once, one decoder/encoder produces
+Opus packets into a ring buffer and every voice client reads from it with
+its own cursor, instead of each guild running its own FFmpeg and encoder.
+"""
+
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, Hashable, Optional, Set, Tuple
+
+import discord
+
+from .audio import FRAME_SECONDS
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+class Broadcast:
+    """One audio pipeline whose Opus packets are shared by many listeners.
+    
+    Packets are produced on demand by whichever listener is furthest ahead.
+    The ring buffer keeps the last `capacity` packets; a listener that falls
+    further behind than that skips ahead to the oldest packet still kept.
+    """
+    
+    def __init__(self, key: Hashable, source: discord.AudioSource, capacity: int):
+        self.key = key
+        self.source = source
+        self.packets: deque = deque(maxlen=capacity)
+        # Index of packets[0] in the stream
+        self.base = 0
+        self.produced = 0
+        # Silent packets sent while the source was still starting up
+        self.lead_in = 0
+        self.ended = False
+        self.listeners = 0
+        self._lock = threading.Lock()
+        self._encoder: Optional[discord.opus.Encoder] = None
+    
+    def joinable(self, window: int) -> bool:
+        """Check if a new listener can still start from the first packet."""
+        return not self.ended and self.base == 0 and self.produced <= window
+    
+    def packet(self, index: int) -> Tuple[bytes, int]:
+        """Get the packet at `index`, producing it if needed.
+        
+        Returns the packet and the index it actually came from.
+        """
+        with self._lock:
+            while index >= self.produced and not self.ended:
+                self._produce()
+            
+            index = max(index, self.base)
+            if index >= self.produced:
+                return b'', index
+            return self.packets[index - self.base], index
+    
+    def _produce(self):
+        """Read one frame from the source into the ring buffer."""
+        data = self.source.read()
+        if not data:
+            self.ended = True
+            return
+        
+        if not self.source.is_opus():
+            if self._encoder is None:
+                self._encoder = discord.opus.Encoder()
+            data = self._encoder.encode(data, self._encoder.SAMPLES_PER_FRAME)
+        if not getattr(self.source, 'started', True):
+            self.lead_in += 1
+        
+        if len(self.packets) == self.packets.maxlen:
+            self.base += 1
+        self.packets.append(data)
+        self.produced += 1
+    
+    def close(self):
+        """Stop the pipeline and free the buffer."""
+        with self._lock:
+            self.ended = True
+            self.packets.clear()
+        self.source.cleanup()
+
+class BroadcastListener(discord.AudioSource):
+    """One voice client's view of a shared broadcast."""
+    
+    def __init__(self, hub: 'BroadcastHub', broadcast: Broadcast, *, start: float = 0):
+        self.hub = hub
+        self.broadcast = broadcast
+        self.start = start
+        self.cursor = 0
+        self._released = False
+    
+    @property
+    def filters(self) -> Hashable:
+        """The filter set the shared pipeline was opened with."""
+        return self.broadcast.key[-1]
+    
+    @property
+    def started(self) -> bool:
+        """Whether real audio has been read, past the startup silence."""
+        return self.cursor > self.broadcast.lead_in
+    
+    @property
+    def position(self) -> float:
+        """Playback position in seconds."""
+        return self.start + max(self.cursor - self.broadcast.lead_in, 0) * FRAME_SECONDS
+    
+    def is_opus(self) -> bool:
+        return True
+    
+    def read(self) -> bytes:
+        data, index = self.broadcast.packet(self.cursor)
+        if data:
+            self.cursor = index + 1
+        return data
+    
+    def cleanup(self):
+        if not self._released:
+            self._released = True
+            self.hub.release(self.broadcast)
+
+class BroadcastHub:
+    """Registry of live broadcasts keyed by (track, start offset, filter set).
+    
+    Broadcasts are reference counted and torn down when the last listener
+    leaves. A guild that is alone with a key keeps a private pipeline, which
+    can change volume and EQ in place; sharing starts with the second guild
+    that opens the same key within the join window.
+    """
+    
+    def __init__(self, *, buffer: Optional[float] = None, join_window: Optional[float] = None):
+        buffer = buffer if buffer is not None else Config.BROADCAST_BUFFER
+        join_window = join_window if join_window is not None else Config.BROADCAST_JOIN_WINDOW
+        self.capacity = max(int(buffer / FRAME_SECONDS), 1)
+        self.join_window = min(int(join_window / FRAME_SECONDS), self.capacity)
+        self.join_seconds = self.join_window * FRAME_SECONDS
+        # Broadcasts new listeners may still join, by key
+        self.joinable: Dict[Hashable, Broadcast] = {}
+        # When a private pipeline was last opened, by key, oldest first
+        self.recent: 'OrderedDict[Hashable, float]' = OrderedDict()
+        self.live: Set[Broadcast] = set()
+        self._lock = threading.Lock()
+    
+    def should_share(self, key: Hashable) -> bool:
+        """Check if a new pipeline for a key should be a broadcast rather than private.
+        
+        True if a broadcast for the key is joinable, or another pipeline for
+        it was opened within the join window; otherwise the opening is
+        remembered so the next one shares.
+        """
+        now = time.monotonic()
+        with self._lock:
+            while self.recent and now - next(iter(self.recent.values())) > self.join_seconds:
+                self.recent.popitem(last=False)
+            broadcast = self.joinable.get(key)
+            if (broadcast is not None and broadcast.joinable(self.join_window)) or key in self.recent:
+                return True
+            self.recent[key] = now
+            return False
+    
+    def listen(self, key: Hashable, open_source: Callable[[], discord.AudioSource], *,
+               start: float = 0) -> BroadcastListener:
+        """Join the broadcast for a key, opening a new pipeline if none is joinable."""
+        with self._lock:
+            broadcast = self.joinable.get(key)
+            if broadcast is None or not broadcast.joinable(self.join_window):
+                broadcast = Broadcast(key, open_source(), self.capacity)
+                self.joinable[key] = broadcast
+                self.live.add(broadcast)
+            broadcast.listeners += 1
+        return BroadcastListener(self, broadcast, start=start)
+    
+    def release(self, broadcast: Broadcast):
+        """Drop one listener, closing the broadcast after the last one."""
+        with self._lock:
+            broadcast.listeners -= 1
+            if broadcast.listeners > 0:
+                return
+            self.live.discard(broadcast)
+            if self.joinable.get(broadcast.key) is broadcast:
+                del self.joinable[broadcast.key]
+        broadcast.close()
+    
+    @property
+    def shared_listeners(self) -> int:
+        """Number of listeners reading a broadcast with at least one other listener."""
+        return sum(b.listeners for b in list(self.live) if b.listeners > 1)
@@ -0,0 +1,325 @@
+"""
+Track resolution cache for the music module.
+"""
+
+import asyncio
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+
+from .config import Config
+from .track import Track
+
+logger = logging.getLogger(__name__)
+
+# Query parameters that never change what a URL points to
+TRACKING_PARAMS = {'si', 'feature', 'pp', 'ab_channel', 'utm_source', 'utm_medium', 'utm_campaign'}
+
+def normalize_query(query: str) -> str:
+    """Normalize a search query or URL into a cache key."""
+    query = query.strip()
+    
+    if query.startswith('spotify:'):
+        return query
+    
+    if not query.startswith(('http://', 'https://')):
+        return 'search:' + ' '.join(query.lower().split())
+    
+    parsed = urlparse(query)
+    host = parsed.netloc.lower()
+    if host.startswith('www.') or host.startswith('m.'):
+        host = host.split('.', 1)[1]
+    params = parse_qs(parsed.query)
+    
+    if host == 'youtu.be':
+        return 'youtube:' + parsed.path.strip('/')
+    if host in ('youtube.com', 'music.youtube.com'):
+        if parsed.path == '/watch' and 'v' in params:
+            return 'youtube:' + params['v'][0]
+        if parsed.path.startswith('/shorts/'):
+            return 'youtube:' + parsed.path.split('/')[2]
+    if host == 'open.spotify.com':
+        parts = [part for part in parsed.path.split('/') if part and not part.startswith('intl-')]
+        return 'spotify:' + ':'.join(parts)
+    
+    kept = sorted((k, v) for k, values in params.items() if k not in TRACKING_PARAMS for v in values)
+    query_string = '&'.join(f"{k}={v}" for k, v in kept)
+    return f"{host}{parsed.path.rstrip('/')}" + (f"?{query_string}" if query_string else '')
+
+class TrackCache:
+    """In-memory LRU of resolved tracks backed by an on-disk SQLite store.
+    
+    Metadata is kept for `Config.TRACK_METADATA_TTL` seconds; the stream URL is
+    only trusted until the expiry encoded in the URL itself. The store is only
+    used once `open` was called; reads and writes go through one I/O thread
+    so SQLite never blocks the event loop and writes land in order.
+    """
+    
+    def __init__(self, path: Optional[str] = None, max_size: Optional[int] = None):
+        self.path = path or Config.TRACK_CACHE_PATH
+        self.max_size = max_size or Config.TRACK_CACHE_SIZE
+        self.entries: 'OrderedDict[str, Tuple[Track, float]]' = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='track-cache')
+    
+    def open(self):
+        """Open the SQLite store, creating it if needed and pruning expired entries."""
+        if self._db is not None:
+            return
+        
+        path = self.path
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS tracks ('
+                'key TEXT PRIMARY KEY, data TEXT NOT NULL, cached_at REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS tracks_cached_at ON tracks(cached_at)')
+            # Rows are only ever replaced, so expired ones are pruned here
+            pruned = self._db.execute(
+                'DELETE FROM tracks WHERE cached_at < ?', (time.time() - Config.TRACK_METADATA_TTL,)
+            ).rowcount
+            self._db.commit()
+            if pruned:
+                logger.info(f"Pruned {pruned} expired entries from the track cache")
+        except sqlite3.Error as e:
+            logger.warning(f"Track cache running in memory only, could not open {path}: {e}")
+            self._db = None
+    
+    async def get(self, query: str) -> Optional[Track]:
+        """Get a cached track for a query, if its metadata is still fresh."""
+        key = normalize_query(query)
+        
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry:
+                self.entries.move_to_end(key)
+        if not entry and self._db:
+            entry = await asyncio.get_running_loop().run_in_executor(self._io, self._load, key)
+            if entry:
+                with self._lock:
+                    self._remember(key, entry)
+        
+        if not entry or time.time() - entry[1] > Config.TRACK_METADATA_TTL:
+            self.misses += 1
+            return None
+        
+        self.hits += 1
+        track, _ = entry
+        return Track.from_data(query, track.to_data())
+    
+    def put(self, query: str, track: Track):
+        """Store a resolved track under the query and its video ID.
+        
+        Tracks from a flat search have no stream URL yet; they are only stored
+        under the query so they never replace a fully resolved video. The
+        in-memory LRU is updated at once and the store in the background.
+        """
+        keys = {normalize_query(query)}
+        if track.stream_url and track.id and track.webpage_url and 'youtube' in track.webpage_url:
+            keys.add('youtube:' + track.id)
+        
+        entry = (Track.from_data(track.query, track.to_data()), time.time())
+        with self._lock:
+            for key in keys:
+                self._remember(key, entry)
+        if self._db:
+            for key in keys:
+                self._io.submit(self._store, key, entry)
+    
+    def recent(self, limit: int) -> List[Track]:
+        """Get the most recently resolved videos, newest first."""
+        if not self._db:
+            return [track for track, _ in reversed(self.entries.values())][:limit]
+        
+        try:
+            with self._lock:
+                rows = self._db.execute(
+                    "SELECT data FROM tracks WHERE key LIKE 'youtube:%' ORDER BY cached_at DESC LIMIT ?", (limit,)
+                ).fetchall()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading track cache: {e}")
+            return []
+        
+        tracks = []
+        for (data,) in rows:
+            data = json.loads(data)
+            tracks.append(Track.from_data(data.pop('query', ''), data))
+        return tracks
+    
+    def _remember(self, key: str, entry: Tuple[Track, float]):
+        """Insert an entry into the in-memory LRU."""
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+    
+    def _load(self, key: str) -> Optional[Tuple[Track, float]]:
+        """Load an entry from the SQLite store; runs on the I/O thread."""
+        if not self._db:
+            return None
+        
+        try:
+            with self._lock:
+                row = self._db.execute('SELECT data, cached_at FROM tracks WHERE key = ?', (key,)).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading track cache: {e}")
+            return None
+        
+        if not row:
+            return None
+        data = json.loads(row[0])
+        return Track.from_data(data.pop('query', key), data), row[1]
+    
+    def _store(self, key: str, entry: Tuple[Track, float]):
+        """Write an entry to the SQLite store; runs on the I/O thread."""
+        if not self._db:
+            return
+        
+        track, cached_at = entry
+        data = dict(track.to_data(), query=track.query)
+        try:
+            with self._lock:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO tracks (key, data, cached_at) VALUES (?, ?, ?)',
+                    (key, json.dumps(data), cached_at)
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing track cache: {e}")
+
+class NegativeCache:
+    """Short-lived memory of queries that failed to resolve.
+    
+    Retrying a query that just failed would pay for the whole extraction
+    again, so failures are answered from here for `Config.NEGATIVE_CACHE_TTL`
+    seconds.
+    """
+    
+    def __init__(self, ttl: Optional[float] = None, max_size: Optional[int] = None):
+        self.ttl = ttl if ttl is not None else Config.NEGATIVE_CACHE_TTL
+        self.max_size = max_size or Config.NEGATIVE_CACHE_SIZE
+        # key -> time the failure expires
+        self.entries: 'OrderedDict[str, float]' = OrderedDict()
+        self.hits = 0
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    def failed(self, query: str) -> bool:
+        """Check if a query failed to resolve within the TTL."""
+        key = normalize_query(query)
+        expires = self.entries.get(key)
+        if expires is None:
+            return False
+        if time.time() >= expires:
+            del self.entries[key]
+            return False
+        self.hits += 1
+        return True
+    
+    def add(self, query: str):
+        """Remember that a query failed to resolve."""
+        key = normalize_query(query)
+        self.entries[key] = time.time() + self.ttl
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_size:
+            self.entries.popitem(last=False)
+
+class SpotifyMatches:
+    """Durable mapping from Spotify track IDs and ISRCs to chosen YouTube video IDs.
+    
+    Matches are kept in memory until `open` was called. Like the track
+    cache, SQLite is only used from one I/O thread.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or Config.TRACK_CACHE_PATH
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._io = ThreadPoolExecutor(max_workers=1, thread_name_prefix='spotify-matches')
+        # Fallback when SQLite is unavailable
+        self._memory: Dict[str, str] = {}
+    
+    def open(self):
+        """Open the SQLite store, creating it if needed."""
+        if self._db is not None:
+            return
+        
+        path = self.path
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS spotify_matches ('
+                'spotify_id TEXT PRIMARY KEY, isrc TEXT, video_id TEXT NOT NULL, '
+                'score REAL NOT NULL, matched_at REAL NOT NULL)'
+            )
+            self._db.execute('CREATE INDEX IF NOT EXISTS spotify_matches_isrc ON spotify_matches (isrc)')
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Spotify matches kept in memory only, could not open {path}: {e}")
+            self._db = None
+    
+    async def get(self, spotify_id: Optional[str] = None, isrc: Optional[str] = None) -> Optional[str]:
+        """Get the YouTube video ID matched to a Spotify track ID, or to any track with the same ISRC."""
+        if not self._db:
+            video_id = self._memory.get('id:' + spotify_id) if spotify_id else None
+            video_id = video_id or (self._memory.get('isrc:' + isrc) if isrc else None)
+        else:
+            video_id = await asyncio.get_running_loop().run_in_executor(self._io, self._load, spotify_id, isrc)
+        
+        if video_id:
+            self.hits += 1
+        else:
+            self.misses += 1
+        return video_id
+    
+    def put(self, spotify_id: str, isrc: Optional[str], video_id: str, score: float):
+        """Remember the video chosen for a Spotify track; the store is written in the background."""
+        if not self._db:
+            self._memory['id:' + spotify_id] = video_id
+            if isrc:
+                self._memory['isrc:' + isrc] = video_id
+            return
+        self._io.submit(self._store, spotify_id, isrc, video_id, score, time.time())
+    
+    def _load(self, spotify_id: Optional[str], isrc: Optional[str]) -> Optional[str]:
+        """Look up a match in the SQLite store; runs on the I/O thread."""
+        try:
+            with self._lock:
+                row = self._db.execute(
+                    'SELECT video_id FROM spotify_matches WHERE spotify_id = ? OR (isrc IS NOT NULL AND isrc = ?) '
+                    'ORDER BY spotify_id = ? DESC LIMIT 1',
+                    (spotify_id, isrc, spotify_id)
+                ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Error reading Spotify matches: {e}")
+            return None
+        return row[0] if row else None
+    
+    def _store(self, spotify_id: str, isrc: Optional[str], video_id: str, score: float, matched_at: float):
+        """Write a match to the SQLite store; runs on the I/O thread."""
+        try:
+            with self._lock:
+                self._db.execute(
+                    'INSERT OR REPLACE INTO spotify_matches VALUES (?, ?, ?, ?, ?)',
+                    (spotify_id, isrc, video_id, score, matched_at)
+                )
+                self._db.commit()
+        except sqlite3.Error as e:
+            logger.error(f"Error writing Spotify matches: {e}")
+
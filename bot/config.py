@@ -16,6 +16,13 @@ class Config:
     # Spotify configuration
     SPOTIFY_CLIENT_ID = os.getenv("SPOTIFY_CLIENT_ID", "your_spotify_client_id")
     SPOTIFY_CLIENT_SECRET = os.getenv("SPOTIFY_CLIENT_SECRET", "your_spotify_client_secret")
+    SPOTIFY_WORKERS = int(os.getenv("SPOTIFY_WORKERS", "2"))
+    SPOTIFY_KNOWN_TRACKS = int(os.getenv("SPOTIFY_KNOWN_TRACKS", "5000"))
+    # YouTube candidates scored per Spotify track, and the duration difference in seconds still counted as a match
+    SPOTIFY_MATCH_CANDIDATES = int(os.getenv("SPOTIFY_MATCH_CANDIDATES", "5"))
+    SPOTIFY_MATCH_TOLERANCE = int(os.getenv("SPOTIFY_MATCH_TOLERANCE", "10"))
+    # Score a match needs to be remembered, unless its duration is within the tolerance
+    SPOTIFY_MATCH_MIN_SCORE = float(os.getenv("SPOTIFY_MATCH_MIN_SCORE", "2.5"))
     
     # Music configuration
     FFMPEG_OPTIONS = {
@@ -23,9 +30,105 @@ class Config:
         'options': '-vn'
     }
     
+    # Track cache settings
+    TRACK_CACHE_PATH = os.getenv("TRACK_CACHE_PATH", "cache.db")
+    TRACK_CACHE_SIZE = int(os.getenv("TRACK_CACHE_SIZE", "1024"))
+    TRACK_METADATA_TTL = int(os.getenv("TRACK_METADATA_TTL", str(7 * 24 * 3600)))
+    STREAM_URL_TTL = int(os.getenv("STREAM_URL_TTL", "3600"))
+    STREAM_URL_MARGIN = 60
+    
+    # Extraction worker settings
+    EXTRACTOR_WORKERS = int(os.getenv("EXTRACTOR_WORKERS", "2"))
+    EXTRACTOR_QUEUE_SIZE = int(os.getenv("EXTRACTOR_QUEUE_SIZE", "32"))
+    EXTRACTOR_TIMEOUT = int(os.getenv("EXTRACTOR_TIMEOUT", "30"))
+    EXTRACTOR_MAX_JOBS = int(os.getenv("EXTRACTOR_MAX_JOBS", "50"))
+    # Seconds a worker waits on a stalled connection before youtube-dl gives up
+    EXTRACTOR_SOCKET_TIMEOUT = int(os.getenv("EXTRACTOR_SOCKET_TIMEOUT", "10"))
+    # Seconds a query that failed to resolve is answered from memory
+    NEGATIVE_CACHE_TTL = int(os.getenv("NEGATIVE_CACHE_TTL", "120"))
+    NEGATIVE_CACHE_SIZE = int(os.getenv("NEGATIVE_CACHE_SIZE", "1024"))
+    # The circuit opens when this share of the last BREAKER_WINDOW extractions failed or took BREAKER_SLOW_CALL seconds
+    BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+    BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "6"))
+    BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+    BREAKER_SLOW_CALL = float(os.getenv("BREAKER_SLOW_CALL", "15"))
+    # Seconds between recovery probes while the circuit is open
+    BREAKER_PROBE_INTERVAL = int(os.getenv("BREAKER_PROBE_INTERVAL", "30"))
+    BREAKER_PROBE_QUERY = os.getenv("BREAKER_PROBE_QUERY", "music")
+    # Seconds between attempts to start the next song while extraction is busy or failing
+    PLAY_RETRY_INTERVAL = int(os.getenv("PLAY_RETRY_INTERVAL", "5"))
+    
+    # Extraction scheduling: concurrent jobs per guild and per user, jobs a guild may have waiting,
+    # and how many jobs in a row owner guilds get per round-robin turn
+    EXTRACTION_GUILD_LIMIT = int(os.getenv("EXTRACTION_GUILD_LIMIT", "2"))
+    EXTRACTION_USER_LIMIT = int(os.getenv("EXTRACTION_USER_LIMIT", "1"))
+    EXTRACTION_GUILD_QUEUE = int(os.getenv("EXTRACTION_GUILD_QUEUE", "8"))
+    EXTRACTION_OWNER_WEIGHT = int(os.getenv("EXTRACTION_OWNER_WEIGHT", "2"))
+    
+    # Prefetch settings; at most PREFETCH_CONCURRENCY extraction workers run prefetches at once
+    PREFETCH_DEPTH = int(os.getenv("PREFETCH_DEPTH", "3"))
+    PREFETCH_CONCURRENCY = int(os.getenv("PREFETCH_CONCURRENCY", "2"))
+    
+    # Queue settings
+    QUEUE_HISTORY_SIZE = int(os.getenv("QUEUE_HISTORY_SIZE", "50"))
+    
+    # Playback state persistence
+    STATE_PATH = os.getenv("STATE_PATH", "state.db")
+    STATE_FLUSH_INTERVAL = float(os.getenv("STATE_FLUSH_INTERVAL", "5"))
+    STATE_RESTORE_CONCURRENCY = int(os.getenv("STATE_RESTORE_CONCURRENCY", "3"))
+    
+    # Idle voice connection settings, in seconds
+    VOICE_ALONE_TIMEOUT = int(os.getenv("VOICE_ALONE_TIMEOUT", "120"))
+    VOICE_IDLE_TIMEOUT = int(os.getenv("VOICE_IDLE_TIMEOUT", "300"))
+    VOICE_SWEEP_INTERVAL = int(os.getenv("VOICE_SWEEP_INTERVAL", "30"))
+    # Seconds per voice connect attempt, attempts before giving up and the first retry delay (doubles each retry)
+    VOICE_CONNECT_TIMEOUT = float(os.getenv("VOICE_CONNECT_TIMEOUT", "10"))
+    VOICE_CONNECT_ATTEMPTS = int(os.getenv("VOICE_CONNECT_ATTEMPTS", "3"))
+    VOICE_CONNECT_BACKOFF = float(os.getenv("VOICE_CONNECT_BACKOFF", "1"))
+    
+    # Per-guild player settings
+    PLAYER_MAILBOX_SIZE = int(os.getenv("PLAYER_MAILBOX_SIZE", "16"))
+    PLAYER_SUBMIT_TIMEOUT = float(os.getenv("PLAYER_SUBMIT_TIMEOUT", "5"))
+    
+    # /play autocomplete settings
+    SUGGEST_INDEX_SIZE = int(os.getenv("SUGGEST_INDEX_SIZE", "5000"))
+    SUGGEST_RESULTS = int(os.getenv("SUGGEST_RESULTS", "5"))
+    SUGGEST_MIN_LENGTH = int(os.getenv("SUGGEST_MIN_LENGTH", "3"))
+    SUGGEST_DEBOUNCE = float(os.getenv("SUGGEST_DEBOUNCE", "0.3"))
+    # Discord drops autocomplete answers after 3 seconds
+    SUGGEST_DEADLINE = float(os.getenv("SUGGEST_DEADLINE", "2"))
+    SUGGEST_CACHE_TTL = int(os.getenv("SUGGEST_CACHE_TTL", "600"))
+    
+    # Search selector settings
+    SEARCH_RESULTS = int(os.getenv("SEARCH_RESULTS", "5"))
+    SEARCH_TIMEOUT = int(os.getenv("SEARCH_TIMEOUT", "60"))
+    
+    # Playlist import settings
+    PLAYLIST_FIRST_PAGE = int(os.getenv("PLAYLIST_FIRST_PAGE", "10"))
+    PLAYLIST_PAGE_SIZE = int(os.getenv("PLAYLIST_PAGE_SIZE", "100"))
+    PLAYLIST_MAX_TRACKS = int(os.getenv("PLAYLIST_MAX_TRACKS", "1000"))
+    # Seconds a whole playlist listing may take in a worker
+    PLAYLIST_TIMEOUT = int(os.getenv("PLAYLIST_TIMEOUT", "120"))
+    IMPORT_PROGRESS_INTERVAL = float(os.getenv("IMPORT_PROGRESS_INTERVAL", "3"))
+    
+    # Tracing settings
+    TRACE_LOG_PATH = os.getenv("TRACE_LOG_PATH", "traces.jsonl")
+    # The trace log is rotated to TRACE_LOG_PATH.1 once it grows past this many bytes
+    TRACE_LOG_MAX_BYTES = int(os.getenv("TRACE_LOG_MAX_BYTES", str(10 * 1024 * 1024)))
+    TRACE_EXEMPLARS = int(os.getenv("TRACE_EXEMPLARS", "10"))
+    
     # Voice settings
     DEFAULT_VOLUME = 50
     MAX_VOLUME = 100
+    JITTER_BUFFER_SECONDS = float(os.getenv("JITTER_BUFFER_SECONDS", "2"))
+    OPUS_PASSTHROUGH = os.getenv("OPUS_PASSTHROUGH", "true").lower() == "true"
+    GAPLESS_PREOPEN = float(os.getenv("GAPLESS_PREOPEN", "5"))
+    CROSSFADE_SECONDS = float(os.getenv("CROSSFADE_SECONDS", "0"))
+    DSP_COMPRESSOR = os.getenv("DSP_COMPRESSOR", "false").lower() == "true"
+    MAX_EQ_GAIN = 12
+    BROADCAST_ENABLED = os.getenv("BROADCAST_ENABLED", "true").lower() == "true"
+    BROADCAST_BUFFER = float(os.getenv("BROADCAST_BUFFER", "30"))
+    BROADCAST_JOIN_WINDOW = float(os.getenv("BROADCAST_JOIN_WINDOW", "10"))
     
     # Moderation settings
     MAX_BULK_DELETE = 100
@@ -43,6 +146,9 @@ class Config:
     # Rate limiting
     COMMAND_COOLDOWN = 3
     
+    # Seconds a command may run before its reply is deferred; Discord fails slash commands not acknowledged within 3
+    RESPONSE_DEFER_AFTER = float(os.getenv("RESPONSE_DEFER_AFTER", "2"))
+    
     @classmethod
     def is_owner(cls, user_id: int) -> bool:
         """Check if user is the bot owner."""
@@ -0,0 +1,184 @@
+"""
+PCM processing chain for the music module.
+
+Every stage works on a whole 20 ms frame at once as a float32 NumPy array of
+shape (samples, channels), so there is no per-sample Python work in the
+audio thread.
+"""
+
+from typing import Iterable, List, Optional, Tuple
+
+import numpy as np
+
+SAMPLE_RATE = 48000
+CHANNELS = 2
+
+def db_to_gain(db: float) -> float:
+    """Convert decibels to a linear gain factor."""
+    return 10 ** (db / 20)
+
+def frame_to_array(pcm: bytes) -> np.ndarray:
+    """Convert interleaved 16-bit PCM to a float32 (samples, channels) array."""
+    return np.frombuffer(pcm, dtype=np.int16).reshape(-1, CHANNELS).astype(np.float32)
+
+def array_to_frame(samples: np.ndarray) -> bytes:
+    """Convert a float32 (samples, channels) array back to 16-bit PCM."""
+    return np.clip(samples, -32768, 32767).astype(np.int16).tobytes()
+
+class Processor:
+    """A stage in the PCM processing chain."""
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        """Process one frame of samples."""
+        raise NotImplementedError
+    
+    @property
+    def active(self) -> bool:
+        """Whether the stage changes the signal at all."""
+        return True
+
+class Gain(Processor):
+    """Volume control that ramps smoothly between gain changes."""
+    
+    def __init__(self, gain: float = 1.0, ramp: float = 0.05):
+        self.target = gain
+        self.current = gain
+        # Largest gain change applied per sample
+        self.step = 1 / max(ramp * SAMPLE_RATE, 1)
+    
+    @property
+    def active(self) -> bool:
+        return self.current != 1.0 or self.target != 1.0
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.current == self.target:
+            return samples * self.current
+        
+        count = len(samples)
+        delta = float(np.clip(self.target - self.current, -self.step * count, self.step * count))
+        ramp = np.linspace(self.current, self.current + delta, count, endpoint=False, dtype=np.float32)
+        self.current = self.target if abs(self.target - self.current - delta) < 1e-6 else self.current + delta
+        return samples * ramp[:, None]
+
+class Compressor(Processor):
+    """Feed-forward compressor with per-frame level detection.
+    
+    The gain computed for each frame is ramped from the previous frame's gain
+    so reductions never click.
+    """
+    
+    def __init__(self, threshold: float = -18.0, ratio: float = 4.0, attack: float = 0.005,
+                 release: float = 0.15, makeup: float = 0.0):
+        self.threshold = threshold
+        self.ratio = ratio
+        self.makeup = db_to_gain(makeup)
+        frame = 0.02
+        self.attack = 1 - np.exp(-frame / attack) if attack > 0 else 1.0
+        self.release = 1 - np.exp(-frame / release) if release > 0 else 1.0
+        self.envelope = 0.0
+        self.gain = 1.0
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        level = float(np.abs(samples).max()) / 32768 if len(samples) else 0.0
+        coefficient = self.attack if level > self.envelope else self.release
+        self.envelope += (level - self.envelope) * coefficient
+        
+        level_db = 20 * np.log10(max(self.envelope, 1e-6))
+        over = level_db - self.threshold
+        reduction = over - over / self.ratio if over > 0 else 0.0
+        gain = db_to_gain(-reduction) * self.makeup
+        
+        ramp = np.linspace(self.gain, gain, len(samples), endpoint=False, dtype=np.float32)
+        self.gain = gain
+        return samples * ramp[:, None]
+
+class Limiter(Compressor):
+    """Brickwall limiter keeping peaks under a ceiling."""
+    
+    def __init__(self, ceiling: float = -1.0, release: float = 0.05):
+        super().__init__(threshold=ceiling, ratio=float('inf'), attack=0, release=release)
+        self.ceiling = db_to_gain(ceiling) * 32767
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        # Level detection is per frame, so clip whatever the ramp let through
+        return np.clip(super().process(samples), -self.ceiling, self.ceiling)
+
+class Equalizer(Processor):
+    """Three band equalizer (bass, mid, treble) as a linear-phase FIR filter.
+    
+    The filter is applied with FFT convolution, carrying the tail of each
+    frame over into the next.
+    """
+    
+    TAPS = 511
+    FFT_SIZE = 2048
+    
+    def __init__(self, bass: float = 0.0, mid: float = 0.0, treble: float = 0.0):
+        self.bands = (bass, mid, treble)
+        self.history = np.zeros((self.TAPS - 1, CHANNELS), dtype=np.float32)
+        self.response = np.fft.rfft(self._design(bass, mid, treble), self.FFT_SIZE)[:, None]
+    
+    @property
+    def active(self) -> bool:
+        return any(self.bands)
+    
+    @classmethod
+    def _design(cls, bass: float, mid: float, treble: float) -> np.ndarray:
+        """Design the filter taps from the band gains in dB."""
+        frequencies = np.fft.rfftfreq(cls.TAPS * 2, 1 / SAMPLE_RATE)
+        frequencies[0] = 1.0
+        bass_weight = 1 / (1 + (frequencies / 250) ** 2)
+        treble_weight = 1 - 1 / (1 + (frequencies / 4000) ** 2)
+        mid_weight = np.exp(-np.log2(frequencies / 1000) ** 2 / 2)
+        gain_db = bass * bass_weight + mid * mid_weight + treble * treble_weight
+        
+        impulse = np.fft.irfft(10 ** (gain_db / 20))
+        impulse = np.roll(impulse, cls.TAPS // 2)[:cls.TAPS]
+        return (impulse * np.hanning(cls.TAPS)).astype(np.float32)
+    
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        block = np.concatenate((self.history, samples))
+        self.history = block[-(self.TAPS - 1):]
+        spectrum = np.fft.rfft(block, self.FFT_SIZE, axis=0) * self.response
+        output = np.fft.irfft(spectrum, self.FFT_SIZE, axis=0)
+        return output[self.TAPS - 1:len(block)].astype(np.float32)
+
+class DSPChain:
+    """Ordered chain of processors applied to 16-bit stereo PCM frames."""
+    
+    def __init__(self, processors: Iterable[Processor] = ()):
+        self.processors: List[Processor] = list(processors)
+    
+    @classmethod
+    def create(cls, *, volume: float = 1.0, eq: Optional[Tuple[float, float, float]] = None,
+               compress: bool = False) -> 'DSPChain':
+        """Build the standard chain: EQ, optional compressor, gain and a limiter."""
+        processors: List[Processor] = []
+        if eq and any(eq):
+            processors.append(Equalizer(*eq))
+        if compress:
+            processors.append(Compressor())
+        processors.append(Gain(volume))
+        processors.append(Limiter())
+        return cls(processors)
+    
+    def get(self, kind: type) -> Optional[Processor]:
+        """Get the first processor of a type."""
+        return next((p for p in self.processors if isinstance(p, kind)), None)
+    
+    def set_eq(self, eq: Optional[Tuple[float, float, float]]):
+        """Replace the equalizer stage, removing it when the EQ is flat."""
+        processors = [p for p in self.processors if not isinstance(p, Equalizer)]
+        if eq and any(eq):
+            processors.insert(0, Equalizer(*eq))
+        self.processors = processors
+    
+    def process(self, pcm: bytes) -> bytes:
+        """Run one PCM frame through the chain."""
+        if not pcm or not any(p.active for p in self.processors if not isinstance(p, Limiter)):
+            return pcm
+        
+        samples = frame_to_array(pcm)
+        for processor in self.processors:
+            samples = processor.process(samples)
+        return array_to_frame(samples)
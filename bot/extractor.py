@@ -0,0 +1,459 @@
+"""
+Extraction worker pool for the music module.
+
+youtube-dl extraction is CPU-heavy pure Python, so it runs in separate worker
+processes instead of threads sharing the event loop's GIL.
+A circuit breaker stops sending jobs to the workers while YouTube is
+failing wholesale, so an outage doesn't keep every worker busy.
+"""
+
+import asyncio
+import http.client
+import logging
+import multiprocessing
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional
+
+import youtube_dl
+
+from .config import Config
+from .scheduler import ExtractionScheduler, current_request
+
+logger = logging.getLogger(__name__)
+
+# Info dict keys sent back from workers; everything else stays in the worker
+COMPACT_KEYS = ('id', 'title', 'duration', 'uploader', 'thumbnail', 'webpage_url', 'url', 'acodec')
+
+# Keys kept from flat search entries, which carry no stream URL
+FLAT_KEYS = ('id', 'title', 'duration', 'uploader')
+
+class DownloadWarnings:
+    """youtube-dl logger that keeps the download failures it only warns about.
+    
+    Searches fetch their result pages with `fatal=False`, so a network
+    failure yields no entries and a warning instead of an error.
+    """
+    
+    def __init__(self):
+        self.failures: List[str] = []
+    
+    def debug(self, message: str):
+        pass
+    
+    def warning(self, message: str):
+        if 'unable to download' in message.lower():
+            self.failures.append(message)
+    
+    def error(self, message: str):
+        pass
+
+# YoutubeDL instances owned by the current worker process
+_worker_options: Dict[str, Any] = {}
+_worker_ytdl = None
+_worker_flat_ytdl = None
+_worker_warnings = DownloadWarnings()
+_worker_pages = None
+
+def _init_worker(options: Dict[str, Any], pages: multiprocessing.Queue):
+    """Create the YoutubeDL instances for a worker process."""
+    global _worker_options, _worker_ytdl, _worker_flat_ytdl, _worker_pages
+    _worker_options = dict(options, logger=_worker_warnings)
+    _worker_pages = pages
+    # Suppress noise about console usage from errors
+    youtube_dl.utils.bug_reports_message = lambda: ''
+    _worker_ytdl = youtube_dl.YoutubeDL(_worker_options)
+    # Lists search results without resolving any formats
+    _worker_flat_ytdl = youtube_dl.YoutubeDL(dict(_worker_options, extract_flat='in_playlist'))
+
+def _check_empty():
+    """Raise UpstreamError if a job came back empty because a download failed."""
+    if _worker_warnings.failures:
+        raise UpstreamError(_worker_warnings.failures[-1])
+
+def _extract(query: str) -> Optional[Dict[str, Any]]:
+    """Extract a query inside a worker and return compact track data."""
+    data = _worker_ytdl.extract_info(query, download=False)
+    
+    if data and 'entries' in data:
+        # Take first item from a playlist or search results
+        entries = [entry for entry in data['entries'] if entry]
+        data = entries[0] if entries else None
+    
+    if not data:
+        _check_empty()
+        return None
+    return {key: data.get(key) for key in COMPACT_KEYS}
+
+def _flat_entries(entries: List[Optional[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """Compact flat playlist or search entries, skipping unavailable ones."""
+    results = []
+    for entry in entries:
+        if not entry or not entry.get('id'):
+            continue
+        result = {key: entry.get(key) for key in FLAT_KEYS}
+        result['webpage_url'] = f"https://www.youtube.com/watch?v={entry['id']}"
+        results.append(result)
+    return results
+
+def _search(query: str, count: int) -> List[Dict[str, Any]]:
+    """Flat YouTube search inside a worker, returning metadata only."""
+    data = _worker_flat_ytdl.extract_info(f"ytsearch{count}:{query}", download=False)
+    results = _flat_entries((data or {}).get('entries') or [])
+    if not results:
+        _check_empty()
+    return results
+
+def _list_playlist(url: str, listing: int, limit: int, first_page: int, page_size: int) -> int:
+    """List up to `limit` playlist entries in one pass, sending them to the parent a page at a time.
+    
+    Listing a page at a time with `playliststart` would make youtube-dl
+    fetch every earlier continuation again for each page, so the entries
+    generator is walked once instead. Returns the number of entries
+    listed, including unavailable ones.
+    """
+    ytdl = youtube_dl.YoutubeDL(dict(_worker_options, extract_flat='in_playlist', noplaylist=False))
+    listed = 0
+    try:
+        data = ytdl.extract_info(url, download=False, process=False) or {}
+        # Playlist URLs hand over to the extractor that does the listing
+        while data.get('_type') in ('url', 'url_transparent'):
+            data = ytdl.extract_info(data['url'], download=False, ie_key=data.get('ie_key'), process=False) or {}
+        
+        page = []
+        size = first_page
+        for entry in islice(data.get('entries') or [], limit):
+            listed += 1
+            page.append(entry)
+            if len(page) >= size:
+                _worker_pages.put((listing, {'title': data.get('title'), 'entries': _flat_entries(page)}))
+                page = []
+                size = page_size
+        if page:
+            _worker_pages.put((listing, {'title': data.get('title'), 'entries': _flat_entries(page)}))
+        if not listed:
+            _check_empty()
+        return listed
+    finally:
+        # Marks the end of the listing, however it ended
+        _worker_pages.put((listing, None))
+
+class TemporaryFailure(Exception):
+    """Base for extraction failures that say nothing about the query itself."""
+
+class ExtractorBusy(TemporaryFailure):
+    """Raised when the extraction queue is full."""
+
+class ExtractorUnavailable(TemporaryFailure):
+    """Raised while the circuit breaker is open."""
+
+class UpstreamError(TemporaryFailure):
+    """Raised by a worker when YouTube could not be reached or refused the request."""
+
+class ExtractionTimeout(TemporaryFailure):
+    """Raised when a job doesn't finish within the extraction timeout."""
+
+class WorkerCrashed(TemporaryFailure):
+    """Raised when a worker process died while jobs were running."""
+
+class VideoUnavailable(Exception):
+    """Raised by a worker when a video or playlist is private, deleted or otherwise unavailable."""
+
+def _call(function: Callable[..., Any], *args: Any) -> Any:
+    """Run a job inside a worker, telling upstream errors apart from failures of one video."""
+    # Only this job's warnings count towards its result
+    _worker_warnings.failures.clear()
+    try:
+        return function(*args)
+    except (youtube_dl.utils.DownloadError, youtube_dl.utils.ExtractorError) as e:
+        # Errors raised while walking a playlist's entries aren't wrapped in a DownloadError;
+        # either kind carries the network error that caused them, if any
+        cause = e.exc_info[1] if e.exc_info else None
+        cause = getattr(cause, 'cause', None) or getattr(e, 'cause', None) or cause
+        if isinstance(cause, (OSError, http.client.HTTPException)):
+            raise UpstreamError(str(e)) from None
+        raise VideoUnavailable(str(e)) from None
+    except (OSError, http.client.HTTPException) as e:
+        raise UpstreamError(str(e)) from None
+
+class CircuitBreaker:
+    """Watches extraction outcomes and opens when too many recent ones fail or run slow.
+    
+    Only timeouts, worker crashes and network or HTTP errors count as
+    failures; a private or deleted video says nothing about upstream. While
+    open, extractions fail fast; the pool probes in the background and closes
+    the circuit once a probe succeeds.
+    """
+    
+    def __init__(self, *, window: Optional[int] = None, min_calls: Optional[int] = None,
+                 failure_rate: Optional[float] = None, slow_call: Optional[float] = None):
+        # True for each recent extraction that failed or was slow
+        self.outcomes: deque = deque(maxlen=window or Config.BREAKER_WINDOW)
+        self.min_calls = min_calls or Config.BREAKER_MIN_CALLS
+        self.failure_rate = failure_rate or Config.BREAKER_FAILURE_RATE
+        self.slow_call = slow_call or Config.BREAKER_SLOW_CALL
+        self.opened_at: Optional[float] = None
+        self.trips = 0
+    
+    @property
+    def is_open(self) -> bool:
+        return self.opened_at is not None
+    
+    def record(self, seconds: float, failed: bool) -> bool:
+        """Record one extraction; returns True if this opened the circuit."""
+        if self.is_open:
+            # Jobs that were already running when it opened
+            return False
+        
+        self.outcomes.append(failed or seconds >= self.slow_call)
+        if len(self.outcomes) >= self.min_calls and sum(self.outcomes) / len(self.outcomes) >= self.failure_rate:
+            self.opened_at = time.monotonic()
+            self.trips += 1
+            return True
+        return False
+    
+    def close(self):
+        """Close the circuit and start over with a clean window."""
+        self.opened_at = None
+        self.outcomes.clear()
+
+class ExtractorPool:
+    """Pool of youtube-dl worker processes with a bounded job queue.
+    
+    Workers are recycled after `max_jobs` extractions to cap memory growth,
+    and all of them are replaced after a job times out, since a running job
+    can't be cancelled and would keep its worker busy.
+    """
+    
+    def __init__(self, options: Dict[str, Any], *, workers: Optional[int] = None,
+                 queue_size: Optional[int] = None, timeout: Optional[float] = None,
+                 max_jobs: Optional[int] = None):
+        # Network reads in a worker give up instead of hanging past the job timeout
+        self.options = {'socket_timeout': Config.EXTRACTOR_SOCKET_TIMEOUT, **options}
+        self.workers = workers or Config.EXTRACTOR_WORKERS
+        self.queue_size = queue_size if queue_size is not None else Config.EXTRACTOR_QUEUE_SIZE
+        self.timeout = timeout or Config.EXTRACTOR_TIMEOUT
+        self.max_jobs = max_jobs or Config.EXTRACTOR_MAX_JOBS
+        self.pending = 0
+        self.breaker = CircuitBreaker()
+        # One slot per worker, so jobs only leave the fair line when a worker is free
+        self.scheduler = ExtractionScheduler(self.workers)
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._probe_task: Optional[asyncio.Task] = None
+        # Workers send playlist pages back on one queue shared by every worker, read on its own thread
+        self._pages: Optional[multiprocessing.Queue] = None
+        self._listings: Dict[int, asyncio.Queue] = {}
+        self._last_listing = 0
+    
+    def _get_executor(self) -> ProcessPoolExecutor:
+        """Get the process pool, starting it on first use."""
+        if self._pages is None:
+            self._pages = multiprocessing.get_context('spawn').Queue()
+            threading.Thread(
+                target=self._read_pages, args=(self._pages, asyncio.get_running_loop()), daemon=True
+            ).start()
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=_init_worker,
+                initargs=(self.options, self._pages),
+                max_tasks_per_child=self.max_jobs
+            )
+        return self._executor
+    
+    async def extract(self, query: str) -> Optional[Dict[str, Any]]:
+        """Extract a query in a worker process."""
+        return await self._run(query, _extract, query)
+    
+    async def search(self, query: str, count: int = 5) -> List[Dict[str, Any]]:
+        """Run a flat search in a worker process, without resolving formats."""
+        return await self._run(query, _search, query, count)
+    
+    async def playlist(self, url: str) -> AsyncIterator[Dict[str, Any]]:
+        """List a playlist in one worker job, yielding its title and entries a page at a time as they arrive."""
+        self._last_listing += 1
+        listing = self._last_listing
+        pages = self._listings[listing] = asyncio.Queue()
+        job = asyncio.ensure_future(self._run(
+            url, _list_playlist, url, listing,
+            Config.PLAYLIST_MAX_TRACKS, Config.PLAYLIST_FIRST_PAGE, Config.PLAYLIST_PAGE_SIZE,
+            timeout=Config.PLAYLIST_TIMEOUT
+        ))
+        try:
+            while True:
+                page = asyncio.ensure_future(pages.get())
+                if not job.done():
+                    await asyncio.wait((page, job), return_when=asyncio.FIRST_COMPLETED)
+                    if not page.done():
+                        page.cancel()
+                        # A job that failed or timed out may never send the end of its listing
+                        job.result()
+                        continue
+                entries = await page
+                if entries is None:
+                    await job
+                    return
+                yield entries
+        finally:
+            del self._listings[listing]
+            job.cancel()
+    
+    def _read_pages(self, pages: multiprocessing.Queue, loop: asyncio.AbstractEventLoop):
+        """Hand playlist pages from the workers to the listings waiting for them; runs on its own thread."""
+        while True:
+            item = pages.get()
+            if item is None:
+                return
+            loop.call_soon_threadsafe(self._deliver_page, *item)
+    
+    def _deliver_page(self, listing: int, entries: Optional[Dict[str, Any]]):
+        pages = self._listings.get(listing)
+        # Pages of listings nobody waits for anymore are dropped
+        if pages is not None:
+            pages.put_nowait(entries)
+    
+    async def _run(self, query: str, function: Callable[..., Any], *args: Any,
+                   timeout: Optional[float] = None) -> Any:
+        """Run a job in a worker process once the scheduler admits it, within the queue bounds and timeout."""
+        if self.breaker.is_open:
+            raise ExtractorUnavailable("Extraction is failing upstream, waiting for it to recover")
+        request = current_request.get()
+        # Background jobs only get half the queue, so they never crowd out interactive ones
+        queue_size = self.queue_size if request.interactive else self.queue_size // 2
+        if self.pending >= self.workers + queue_size:
+            raise ExtractorBusy(f"Extraction queue is full ({self.pending} jobs pending)")
+        if self.scheduler.queued(request.guild_id, request.interactive) >= Config.EXTRACTION_GUILD_QUEUE:
+            raise ExtractorBusy(f"Too many extractions queued for guild {request.guild_id}")
+        
+        self.pending += 1
+        try:
+            async with self.scheduler.slot():
+                # The circuit may have opened while this job waited
+                if self.breaker.is_open:
+                    raise ExtractorUnavailable("Extraction is failing upstream, waiting for it to recover")
+                return await self._measured(query, function, *args, timeout=timeout)
+        finally:
+            self.pending -= 1
+    
+    async def _measured(self, query: str, function: Callable[..., Any], *args: Any,
+                        timeout: Optional[float] = None) -> Any:
+        """Run a job and feed its outcome to the circuit breaker."""
+        started = time.monotonic()
+        failed = False
+        try:
+            return await self._submit(query, function, *args, timeout=timeout)
+        except TemporaryFailure:
+            failed = True
+            raise
+        except asyncio.CancelledError:
+            # The caller gave up, which says nothing about upstream
+            failed = None
+            raise
+        finally:
+            # Jobs given a longer timeout, like whole playlist listings, are slow by nature
+            seconds = time.monotonic() - started if timeout is None else 0
+            if failed is not None and self.breaker.record(seconds, failed):
+                logger.error(f"Extraction circuit opened after {sum(self.breaker.outcomes)} bad results "
+                             f"in the last {len(self.breaker.outcomes)}")
+                self._probe_task = asyncio.ensure_future(self._probe())
+    
+    async def _submit(self, query: str, function: Callable[..., Any], *args: Any,
+                      timeout: Optional[float] = None) -> Any:
+        """Submit a job to the worker processes and wait for it within the timeout."""
+        timeout = timeout or self.timeout
+        try:
+            future = self._get_executor().submit(_call, function, *args)
+            try:
+                return await asyncio.wait_for(asyncio.wrap_future(future), timeout)
+            except asyncio.TimeoutError:
+                if not future.cancel():
+                    logger.warning(f"Extraction of {query} timed out while running, replacing the workers")
+                    self._recycle()
+                raise ExtractionTimeout(f"Extraction timed out after {timeout}s: {query}") from None
+        except BrokenProcessPool as e:
+            logger.error("Extractor pool broke, restarting workers")
+            self._shutdown()
+            raise WorkerCrashed(str(e)) from None
+    
+    async def _probe(self):
+        """Run a small search every probe interval until one succeeds in time, then close the circuit."""
+        while self.breaker.is_open:
+            await asyncio.sleep(Config.BREAKER_PROBE_INTERVAL)
+            started = time.monotonic()
+            try:
+                await self._submit('probe', _search, Config.BREAKER_PROBE_QUERY, 1)
+            except Exception as e:
+                logger.warning(f"Extraction probe failed, circuit stays open: {e}")
+                continue
+            if time.monotonic() - started < self.breaker.slow_call:
+                self.breaker.close()
+                logger.info("Extraction probe succeeded, circuit closed")
+    
+    def close(self):
+        """Stop probing and shut down the worker processes."""
+        if self._probe_task is not None:
+            self._probe_task.cancel()
+            self._probe_task = None
+        self._shutdown()
+        if self._pages is not None:
+            # Stops the thread reading playlist pages
+            self._pages.put(None)
+            self._pages = None
+    
+    def _recycle(self):
+        """Start fresh workers for new jobs and let the old ones exit once their running jobs end."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False)
+            self._executor = None
+    
+    def _shutdown(self):
+        """Shut down the worker processes; they restart on the next job."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key into one in-flight task.
+    
+    The shared call is cancelled once every caller waiting on it is.
+    """
+    
+    def __init__(self):
+        self.calls: Dict[str, asyncio.Future] = {}
+        self.waiting: Dict[str, int] = {}
+        self.coalesced = 0
+    
+    async def run(self, key: str, factory: Callable[[], Awaitable[Any]]) -> Any:
+        """Run `factory` for a key, or join the call already in flight."""
+        future = self.calls.get(key)
+        if future is None:
+            future = asyncio.ensure_future(factory())
+            self.calls[key] = future
+            future.add_done_callback(lambda done: self._forget(key, done))
+        else:
+            self.coalesced += 1
+        
+        self.waiting[key] = self.waiting.get(key, 0) + 1
+        try:
+            # A cancelled waiter must not cancel the shared call for everyone else
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            if self.waiting.get(key) == 1 and self.calls.get(key) is future:
+                # Nobody is left waiting, so the extraction is wasted work
+                future.cancel()
+            raise
+        finally:
+            if key in self.waiting:
+                self.waiting[key] -= 1
+                if not self.waiting[key]:
+                    del self.waiting[key]
+    
+    def _forget(self, key: str, future: asyncio.Future):
+        """Drop a finished call so the next request starts a fresh one."""
+        if self.calls.get(key) is future:
+            del self.calls[key]
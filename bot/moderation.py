@@ -7,6 +7,7 @@ from typing import Optional
 import discord
 from discord.ext import commands
 from .config import Config
+from .responder import Responder
 from .utils import Utils
 
 logger = logging.getLogger(__name__)
@@ -37,14 +38,9 @@ class Moderation(commands.Cog):
     
     async def _kick_member(self, ctx_or_interaction, member: discord.Member, reason: str):
         """Helper method for kicking members."""
-        if isinstance(ctx_or_interaction, discord.Interaction):
-            author = ctx_or_interaction.user
-            guild = ctx_or_interaction.guild
-            respond = ctx_or_interaction.response.send_message
-        else:
-            author = ctx_or_interaction.author
-            guild = ctx_or_interaction.guild
-            respond = lambda **kwargs: self.utils.safe_send(ctx_or_interaction, **kwargs)
+        reply = Responder(ctx_or_interaction, self.utils)
+        author = reply.user
+        guild = reply.guild
         
         # Check if target is the owner
         if self.utils.is_owner_protected(member):
@@ -53,7 +49,7 @@ class Moderation(commands.Cog):
                 "You cannot kick the bot owner.",
                 "error"
             )
-            return await respond(embed=embed)
+            return await reply.send(embed=embed)
         
         # Check if target is higher role than executor
         if member.top_role >= author.top_role and author != guild.owner:
@@ -62,7 +58,7 @@ class Moderation(commands.Cog):
                 "You cannot kick someone with a higher or equal role.",
                 "error"
             )
-            return await respond(embed=embed)
+            return await reply.send(embed=embed)
         
         # Check if bot can kick the member
         if member.top_role >= guild.me.top_role:
@@ -71,7 +67,7 @@ class Moderation(commands.Cog):
                 "I cannot kick someone with a higher or equal role than me.",
                 "error"
             )
-            return await respond(embed=embed)
+            return await reply.send(embed=embed)
         
         try:
             # Try to DM the user before kicking
@@ -4,24 +4,38 @@ Music functionality for the Discord bot.
 
 import asyncio
 import logging
-from typing import Dict, List, Optional
+import time
+from typing import AsyncIterator, Dict, Hashable, List, Optional, Set, Tuple
+from urllib.parse import parse_qs, urlparse
 import discord
 from discord.ext import commands
 import spotipy
 from spotipy.oauth2 import SpotifyClientCredentials
-import youtube_dl
+from .audio import FRAME_SECONDS, BufferedSource, GaplessSource, ProcessedSource, ffmpeg_process_count
+from .broadcast import BroadcastHub
+from .cache import NegativeCache, SpotifyMatches, TrackCache, normalize_query
 from .config import Config
+from .dsp import DSPChain
+from .extractor import ExtractorBusy, ExtractorPool, SingleFlight, TemporaryFailure, VideoUnavailable
+from .music_queue import MusicQueue
+from .player import GuildPlayer, PlayerBusy, PlayerClosed
+from .prefetch import Prefetcher
+from .responder import Responder
+from .scheduler import ExtractionRequest, current_request
+from .spotify import SpotifyCatalog, parse_spotify_url, score_match
+from .state import StateJournal, track_from_data, track_to_data
+from .suggest import Suggester, TitleIndex
+from .tracing import LatencyHistogram, Trace, current_trace, span, tracer
+from .track import Track
 from .utils import Utils
 
 logger = logging.getLogger(__name__)
 
-# Suppress noise about console usage from errors
-youtube_dl.utils.bug_reports_message = lambda: ''
-
 ytdl_format_options = {
     'format': 'bestaudio/best',
     'outtmpl': '%(extractor)s-%(id)s-%(title)s.%(ext)s',
     'restrictfilenames': True,
+    # Single extractions play just the video; playlists are listed flat page by page
     'noplaylist': True,
     'nocheckcertificate': True,
     'ignoreerrors': False,
@@ -37,7 +51,18 @@ ffmpeg_options = {
     'options': '-vn'
 }
 
-ytdl = youtube_dl.YoutubeDL(ytdl_format_options)
+# Each extraction worker process builds its own YoutubeDL from these options. Workers
+# re-import the main module and with it this one, so nothing here may touch disk.
+extractor = ExtractorPool(ytdl_format_options)
+resolutions = SingleFlight()
+
+track_cache = TrackCache()
+failed_queries = NegativeCache()
+broadcasts = BroadcastHub()
+
+# Autocomplete for /play, seeded from recently resolved videos when the cog loads
+title_index = TitleIndex()
+suggester = Suggester(lambda text: extractor.search(text, Config.SUGGEST_RESULTS), title_index)
 
 # Initialize Spotify client
 try:
@@ -51,120 +76,363 @@ except Exception as e:
     logger.warning(f"Failed to initialize Spotify client: {e}")
     spotify_client = None
 
-class YTDLSource(discord.PCMVolumeTransformer):
+spotify = SpotifyCatalog(spotify_client) if spotify_client else None
+spotify_matches = SpotifyMatches()
+
+def get_ffmpeg_options(start: float = 0) -> Dict[str, str]:
+    """Get FFmpeg options, optionally starting at an offset in seconds."""
+    options = dict(ffmpeg_options)
+    if start:
+        options['before_options'] = f"{options['before_options']} -ss {start:.2f}"
+    return options
+
+class YTDLSource(ProcessedSource):
     """Audio source using youtube-dl."""
     
-    def __init__(self, source, *, data, volume=0.5):
-        super().__init__(source, volume)
+    def __init__(self, source, *, data, volume=0.5, eq=None, start: float = 0):
+        # The jitter buffer sits before the DSP chain so volume changes apply immediately
+        super().__init__(BufferedSource(source), DSPChain.create(volume=volume, eq=eq, compress=Config.DSP_COMPRESSOR))
         self.data = data
         self.title = data.get('title')
         self.url = data.get('url')
         self.duration = data.get('duration')
         self.thumbnail = data.get('thumbnail')
         self.uploader = data.get('uploader')
+        self.start = start
+    
+    @property
+    def started(self) -> bool:
+        """Whether real audio has been read, past the startup silence."""
+        return self.original.started
+    
+    @property
+    def position(self) -> float:
+        """Playback position in seconds."""
+        return self.start + self.original.frames * FRAME_SECONDS
     
     @classmethod
     async def create_source(cls, search: str, *, loop=None):
         """Create audio source from search query."""
+        track = await cls.resolve(search, loop=loop)
+        if track:
+            return cls.from_track(track)
+        return None
+    
+    @classmethod
+    async def resolve(cls, search: str, *, loop=None, margin: float = Config.STREAM_URL_MARGIN,
+                      lazy: bool = False) -> Optional[Track]:
+        """Resolve a search query to a track without opening a stream.
+        
+        With `lazy`, plain-text searches only run a flat search and return a
+        track without a stream URL; formats are extracted when it is about
+        to play. Returns None if the query has no playable result; raises
+        TemporaryFailure if extraction is busy or failing, which is not
+        remembered against the query.
+        """
         loop = loop or asyncio.get_event_loop()
+        lazy = lazy and not search.startswith(('http://', 'https://')) and 'spotify:' not in search
         
+        with span('cache_lookup'):
+            cached = await track_cache.get(search)
+        if cached and (lazy or cached.stream_valid(margin)):
+            return cached
+        if failed_queries.failed(search):
+            return None
+        
+        # Concurrent resolutions of the same query share one extraction
+        key = normalize_query(search)
+        try:
+            track = await resolutions.run(
+                'flat:' + key if lazy else key,
+                (lambda: cls._resolve_flat(search)) if lazy else (lambda: cls._resolve_uncached(search, cached, loop))
+            )
+        except TemporaryFailure:
+            raise
+        except Exception as e:
+            # Not known to be the query's fault, so it is retried next time
+            logger.error(f"Error resolving {search}: {e}")
+            return None
+        if track:
+            # Every waiter gets its own copy of the shared result
+            return Track.from_data(search, track.to_data())
+        failed_queries.add(search)
+        return None
+    
+    @classmethod
+    async def refresh(cls, track: Track, margin: float = Config.STREAM_URL_MARGIN) -> bool:
+        """Re-resolve a track in place so its stream URL stays valid for `margin` seconds.
+        
+        Raises TemporaryFailure like `resolve`.
+        """
+        resolved = await cls.resolve(track.webpage_url or track.query, margin=margin)
+        if not resolved:
+            return False
+        track.update(resolved)
+        return True
+    
+    @classmethod
+    async def _resolve_uncached(cls, search: str, cached: Optional[Track], loop) -> Optional[Track]:
+        """Resolve a query that has no usable cache entry; None means it has no playable result."""
         try:
+            if cached and cached.webpage_url:
+                # Metadata is still fresh, only the signed stream URL expired
+                data = await cls._extract(cached.webpage_url)
             # Check if it's a Spotify URL/URI
-            if 'spotify.com' in search or 'spotify:' in search:
+            elif 'spotify.com' in search or 'spotify:' in search:
                 if spotify_client:
-                    # Extract track info from Spotify
-                    track_info = await cls._get_spotify_track_info(search, loop)
-                    if track_info:
-                        # Search for the track on YouTube
-                        search_query = f"{track_info['artist']} {track_info['name']}"
-                        data = await loop.run_in_executor(None, lambda: ytdl.extract_info(f"ytsearch:{search_query}", download=False))
-                    else:
+                    video_id = await cls._match_spotify(search, loop)
+                    if not video_id:
                         return None
+                    data = await cls._extract(f"https://www.youtube.com/watch?v={video_id}")
                 else:
                     logger.warning("Spotify client not available")
                     return None
             else:
                 # Regular YouTube search
-                data = await loop.run_in_executor(None, lambda: ytdl.extract_info(search, download=False))
-            
-            if data and 'entries' in data and data['entries']:
-                # Take first item from a playlist or search results
-                data = data['entries'][0]
-            
-            if data and 'url' in data:
-                filename = data['url']
-                return cls(discord.FFmpegPCMAudio(filename, **ffmpeg_options), data=data)
-            else:
-                return None
-        except Exception as e:
-            logger.error(f"Error creating audio source: {e}")
+                data = await cls._extract(search)
+        except VideoUnavailable as e:
+            logger.info(f"Nothing playable for {search}: {e}")
+            return None
+        
+        if data and 'url' in data:
+            track = Track.from_data(search, data)
+            track_cache.put(search, track)
+            return track
+        return None
+    
+    @classmethod
+    async def _resolve_flat(cls, search: str) -> Optional[Track]:
+        """Resolve a plain-text search to its top result's metadata only."""
+        try:
+            results = await cls.search(search, 1)
+        except VideoUnavailable as e:
+            logger.info(f"Nothing playable for {search}: {e}")
+            return None
+        
+        if not results:
+            return None
+        track = Track.from_data(search, results[0].to_data())
+        track_cache.put(search, track)
+        return track
+    
+    @classmethod
+    async def search(cls, query: str, count: int = 5) -> List[Track]:
+        """Flat search returning metadata-only tracks, without resolving formats."""
+        with span('search'):
+            results = await extractor.search(query, count)
+        return [Track.from_data(result['webpage_url'], result) for result in results]
+    
+    @staticmethod
+    def is_playlist(url: str) -> bool:
+        """Check if a URL is a YouTube playlist rather than a single video."""
+        if not url.startswith(('http://', 'https://')):
+            return False
+        parsed = urlparse(url)
+        host = parsed.netloc.lower().split(':')[0]
+        return (host.endswith('youtube.com') and parsed.path == '/playlist'
+                and 'list' in parse_qs(parsed.query))
+    
+    @classmethod
+    async def playlist_pages(cls, url: str) -> AsyncIterator[Tuple[Optional[str], List[Track]]]:
+        """List a playlist flat, yielding its title and a page of metadata-only tracks at a time.
+        
+        The playlist is listed once in a worker that sends pages back as it
+        goes. The first page is small so playback can start right away.
+        """
+        async for page in extractor.playlist(url):
+            yield page['title'], [Track.from_data(entry['webpage_url'], entry) for entry in page['entries']]
+    
+    @classmethod
+    async def _extract(cls, query: str):
+        """Run youtube-dl extraction in the worker pool."""
+        with span('extract'):
+            return await extractor.extract(query)
+    
+    @classmethod
+    def can_passthrough(cls, track: Track, volume: int, eq=None) -> bool:
+        """Check if a track can skip decoding: Opus stream, default volume and flat EQ."""
+        return (Config.OPUS_PASSTHROUGH and track.codec == 'opus'
+                and volume == Config.DEFAULT_VOLUME and not (eq and any(eq)))
+    
+    @classmethod
+    def filter_key(cls, track: Track, volume: int, eq=None) -> Hashable:
+        """Describe the processing a track's pipeline applies."""
+        if cls.can_passthrough(track, volume, eq):
+            return 'opus'
+        return ('pcm', volume, tuple(eq or ()), Config.DSP_COMPRESSOR)
+    
+    @classmethod
+    def from_track(cls, track: Track, *, volume: int = Config.DEFAULT_VOLUME, eq=None, start: float = 0):
+        """Open the audio pipeline for a resolved track.
+        
+        Guilds playing the same track from the same offset with the same
+        filters share one pipeline through the broadcast hub; a guild alone
+        with a track gets a private one, so volume and EQ change in place.
+        """
+        if Config.BROADCAST_ENABLED and not Config.CROSSFADE_SECONDS:
+            key = (track.id or track.stream_url, round(start, 2), cls.filter_key(track, volume, eq))
+            if broadcasts.should_share(key):
+                return broadcasts.listen(key, lambda: cls.open(track, volume=volume, eq=eq, start=start), start=start)
+        return cls.open(track, volume=volume, eq=eq, start=start)
+    
+    @classmethod
+    def open(cls, track: Track, *, volume: int = Config.DEFAULT_VOLUME, eq=None, start: float = 0):
+        """Open a dedicated FFmpeg pipeline for a resolved track.
+        
+        Opus streams without processing are passed through without decoding;
+        everything else is decoded to PCM and run through the DSP chain.
+        """
+        if cls.can_passthrough(track, volume, eq):
+            return YTDLOpusSource(track.stream_url, data=track.to_data(), start=start)
+        
+        return cls(
+            discord.FFmpegPCMAudio(track.stream_url, **get_ffmpeg_options(start)),
+            data=track.to_data(),
+            volume=volume / Config.DEFAULT_VOLUME,
+            eq=eq,
+            start=start
+        )
+    
+    @classmethod
+    async def _match_spotify(cls, spotify_url: str, loop) -> Optional[str]:
+        """Get the YouTube video ID for a Spotify track.
+        
+        Known tracks come straight from the match table. Otherwise one flat
+        search is scored against the track's duration and title and the best
+        candidate is played; it is only stored for next time if it scored
+        well or its duration matches.
+        """
+        parsed = parse_spotify_url(spotify_url)
+        if not parsed or parsed[0] != 'track':
+            return None
+        video_id = await spotify_matches.get(parsed[1])
+        if video_id:
+            return video_id
+        
+        # Extract track info from Spotify
+        track_info = await cls._get_spotify_track_info(spotify_url, loop)
+        if not track_info:
+            return None
+        video_id = await spotify_matches.get(isrc=track_info['isrc']) if track_info['isrc'] else None
+        if video_id:
+            # Same recording under another release, no search was scored
+            spotify_matches.put(parsed[1], track_info['isrc'], video_id, 0)
+            return video_id
+        
+        # Search for the track on YouTube
+        candidates = await cls.search(f"{track_info['artist']} {track_info['name']}", Config.SPOTIFY_MATCH_CANDIDATES)
+        if not candidates:
             return None
+        score, best = max(((score_match(track_info, c.to_data()), c) for c in candidates), key=lambda pair: pair[0])
+        same_length = bool(best.duration and track_info['duration']
+                           and abs(best.duration - track_info['duration']) <= Config.SPOTIFY_MATCH_TOLERANCE)
+        if best.id and (score >= Config.SPOTIFY_MATCH_MIN_SCORE or same_length):
+            spotify_matches.put(parsed[1], track_info['isrc'], best.id, score)
+        elif best.id:
+            # A weak guess is played but searched again next time
+            logger.info(f"Not remembering weak match {best.id} (score {score:.2f}) for {track_info['artist']} - {track_info['name']}")
+        return best.id
     
     @classmethod
     async def _get_spotify_track_info(cls, spotify_url: str, loop):
         """Extract track information from Spotify URL."""
         try:
-            # Extract track ID from Spotify URL
-            if 'track/' in spotify_url:
-                track_id = spotify_url.split('track/')[-1].split('?')[0]
-            elif 'spotify:track:' in spotify_url:
-                track_id = spotify_url.split('spotify:track:')[-1]
-            else:
+            parsed = parse_spotify_url(spotify_url)
+            if not parsed or parsed[0] != 'track':
                 return None
             
             # Get track info from Spotify
-            if spotify_client:
-                track_info = await loop.run_in_executor(None, lambda: spotify_client.track(track_id))
-                
-                return {
-                    'name': track_info['name'],
-                    'artist': track_info['artists'][0]['name'],
-                    'album': track_info['album']['name'],
-                    'duration': track_info['duration_ms'] // 1000,
-                    'external_url': track_info['external_urls']['spotify']
-                }
+            if spotify:
+                with span('spotify'):
+                    return await spotify.track(parsed[1])
             return None
         except Exception as e:
             logger.error(f"Error getting Spotify track info: {e}")
             return None
+    
+    @classmethod
+    def from_spotify(cls, info) -> Track:
+        """Build a metadata-only track for a Spotify track, matched on YouTube when it is about to play."""
+        return Track(
+            f"spotify:track:{info['id']}" if info['id'] else f"ytsearch:{info['artist']} {info['name']}",
+            title=f"{info['artist']} - {info['name']}" if info['artist'] else info['name'],
+            duration=info['duration'] or None
+        )
+    
+    @classmethod
+    async def spotify_pages(cls, kind: str, item_id: str) -> AsyncIterator[Tuple[Optional[str], List[Track]]]:
+        """Yield pages of metadata-only tracks for a Spotify album, playlist or artist."""
+        async for name, infos in spotify.pages(kind, item_id):
+            yield name, [cls.from_spotify(info) for info in infos]
 
-class MusicQueue:
-    """Music queue management."""
+class YTDLOpusSource(discord.AudioSource):
+    """Opus passthrough source: FFmpeg copies packets without re-encoding."""
+    
+    filters = 'opus'
+    
+    def __init__(self, url: str, *, data, start: float = 0):
+        self.original = BufferedSource(discord.FFmpegOpusAudio(url, codec='copy', **get_ffmpeg_options(start)))
+        self.data = data
+        self.title = data.get('title')
+        self.url = url
+        self.duration = data.get('duration')
+        self.thumbnail = data.get('thumbnail')
+        self.uploader = data.get('uploader')
+        self.start = start
     
-    def __init__(self):
-        self.queue: List[YTDLSource] = []
-        self.current: Optional[YTDLSource] = None
-        self.loop_song = False
-        self.loop_queue = False
+    def is_opus(self) -> bool:
+        return True
     
-    def add(self, source: YTDLSource):
-        """Add song to queue."""
-        self.queue.append(source)
+    def read(self) -> bytes:
+        return self.original.read()
     
-    def get_next(self) -> Optional[YTDLSource]:
-        """Get next song from queue."""
-        if self.loop_song and self.current:
-            return self.current
-        
-        if not self.queue:
-            return None
-        
-        next_song = self.queue.pop(0)
-        
-        if self.loop_queue and self.current:
-            self.queue.append(self.current)
-        
-        self.current = next_song
-        return next_song
+    def cleanup(self):
+        self.original.cleanup()
+    
+    @property
+    def started(self) -> bool:
+        """Whether real audio has been read, past the startup silence."""
+        return self.original.started
     
-    def clear(self):
-        """Clear the queue."""
-        self.queue.clear()
-        self.current = None
+    @property
+    def position(self) -> float:
+        """Playback position in seconds."""
+        return self.start + self.original.frames * FRAME_SECONDS
+
+class SearchView(discord.ui.View):
+    """Lets the user who searched pick one result to play."""
+    
+    def __init__(self, music: 'Music', user_id: int, tracks: List[Track]):
+        super().__init__(timeout=Config.SEARCH_TIMEOUT)
+        self.music = music
+        self.user_id = user_id
+        self.tracks = tracks
+        self.select = discord.ui.Select(
+            placeholder="Pick a song to play",
+            options=[
+                discord.SelectOption(
+                    label=f"{i}. {track.title}"[:100],
+                    description=(track.uploader or '')[:100] or None,
+                    value=str(i - 1)
+                )
+                for i, track in enumerate(tracks, 1)
+            ]
+        )
+        self.select.callback = self.on_select
+        self.add_item(self.select)
+    
+    async def interaction_check(self, interaction: discord.Interaction) -> bool:
+        if interaction.user.id != self.user_id:
+            await interaction.response.send_message("Only the person who searched can pick a song.", ephemeral=True)
+            return False
+        return True
     
-    def skip(self) -> Optional[YTDLSource]:
-        """Skip current song."""
-        return self.get_next()
+    async def on_select(self, interaction: discord.Interaction):
+        track = self.tracks[int(self.select.values[0])]
+        self.stop()
+        if interaction.message:
+            await interaction.message.edit(view=None)
+        await self.music._play_music(interaction, track.title, track=track)
 
 class Music(commands.Cog):
     """Music commands cog."""
@@ -174,6 +442,265 @@ class Music(commands.Cog):
         self.utils = Utils(bot)
         self.queues: Dict[int, MusicQueue] = {}
         self.voice_clients: Dict[int, discord.VoiceClient] = {}
+        self.players: Dict[int, GuildPlayer] = {}
+        # Running playlist imports, by guild
+        self.imports: Dict[int, Set[asyncio.Task]] = {}
+        self.prefetcher = Prefetcher(YTDLSource.refresh)
+        self.journal = StateJournal()
+        # Queue revision last written to the journal, by guild
+        self.journaled: Dict[int, int] = {}
+        self._journal_task: Optional[asyncio.Task] = None
+        # When each guild was first seen idle, and guilds paused because everyone left
+        self.idle_since: Dict[int, float] = {}
+        self.paused_alone: Set[int] = set()
+        self._reaper_task: Optional[asyncio.Task] = None
+        # Guilds waiting for extraction to recover before starting their next song
+        self.stalled: Dict[int, asyncio.Task] = {}
+        # Voice connects in flight, and how long connecting took, by guild
+        self.connects = SingleFlight()
+        self.connect_latency: Dict[int, LatencyHistogram] = {}
+    
+    async def cog_load(self):
+        """Open the caches, resume saved playback and start reaping idle guilds once the bot is connected."""
+        await self.bot.loop.run_in_executor(None, track_cache.open)
+        await self.bot.loop.run_in_executor(None, spotify_matches.open)
+        recent = await self.bot.loop.run_in_executor(None, track_cache.recent, Config.SUGGEST_INDEX_SIZE)
+        for track in reversed(recent):
+            title_index.record(track.title, track.webpage_url)
+        self._journal_task = asyncio.create_task(self._run_journal())
+        self._reaper_task = asyncio.create_task(self._run_reaper())
+    
+    async def cog_unload(self):
+        """Stop background work and the extraction workers when the cog is removed."""
+        if self._reaper_task:
+            self._reaper_task.cancel()
+        if self._journal_task:
+            self._journal_task.cancel()
+        # Voice clients are still connected here, so this saves the live positions
+        await self._flush_state()
+        for guild_id in list(self.imports):
+            self._cancel_imports(guild_id)
+        for player in self.players.values():
+            player.close()
+        for task in self.stalled.values():
+            task.cancel()
+        self.prefetcher.close()
+        extractor.close()
+        if spotify:
+            spotify.close()
+    
+    async def _run_journal(self):
+        """Restore saved playback, then keep journaling playback state."""
+        await self.bot.wait_until_ready()
+        try:
+            await self._restore_state()
+        except Exception as e:
+            logger.error(f"Error restoring playback state: {e}")
+        
+        while True:
+            await asyncio.sleep(Config.STATE_FLUSH_INTERVAL)
+            try:
+                await self._flush_state()
+            except Exception as e:
+                logger.error(f"Error saving playback state: {e}")
+    
+    async def _flush_state(self):
+        """Write the state of every playing guild to the journal in one batch."""
+        players = {}
+        queues = {}
+        for guild_id, queue in self.queues.items():
+            voice_client = self.voice_clients.get(guild_id)
+            gapless = self._playing_source(guild_id)
+            if not gapless:
+                continue
+            
+            players[guild_id] = {
+                'channel_id': voice_client.channel.id,
+                'current': track_to_data(gapless.track),
+                'position': getattr(gapless.current, 'position', 0),
+                'loop_song': queue.loop_song,
+                'loop_queue': queue.loop_queue,
+                'volume': queue.volume,
+                'eq': list(queue.eq)
+            }
+            # Only rewrite the queue itself when it changed
+            if self.journaled.get(guild_id) != queue.revision:
+                queues[guild_id] = list(queue)
+                self.journaled[guild_id] = queue.revision
+        
+        removed = [guild_id for guild_id in self.journaled if guild_id not in players]
+        for guild_id in removed:
+            del self.journaled[guild_id]
+        
+        if players or queues or removed:
+            await self.bot.loop.run_in_executor(None, self.journal.save, players, queues, removed)
+    
+    async def _restore_state(self):
+        """Rejoin voice channels and resume every guild saved in the journal."""
+        states = await self.bot.loop.run_in_executor(None, self.journal.load)
+        if not states:
+            return
+        
+        # Guilds that fail to restore are dropped from the journal on the next flush
+        self.journaled.update((guild_id, -1) for guild_id in states)
+        logger.info(f"Restoring playback in {len(states)} guilds")
+        
+        # Bound voice connects and extractions so a restart doesn't stampede them
+        semaphore = asyncio.Semaphore(Config.STATE_RESTORE_CONCURRENCY)
+        
+        async def restore(guild_id, state):
+            async with semaphore:
+                try:
+                    await self.get_player(guild_id).call('restore', self._restore_guild, guild_id, state)
+                except PlayerClosed:
+                    # The guild was dropped meanwhile, e.g. its voice connect failed
+                    logger.info(f"Stopped restoring playback in guild {guild_id}, its player was closed")
+                except Exception as e:
+                    logger.error(f"Error restoring playback in guild {guild_id}: {e}")
+        
+        await asyncio.gather(*(restore(guild_id, state) for guild_id, state in states.items()))
+    
+    async def _restore_guild(self, guild_id: int, state: Dict):
+        """Resume one guild's playback from its saved state; runs on the guild's player."""
+        channel = self.bot.get_channel(state['channel_id'])
+        if not isinstance(channel, (discord.VoiceChannel, discord.StageChannel)):
+            return
+        if not any(not member.bot for member in channel.members):
+            logger.info(f"Not resuming in guild {guild_id}, nobody is listening")
+            return
+        
+        queue = self.get_queue(guild_id)
+        queue.extend(track_from_data(data) for data in state['queue'])
+        queue.loop_song = state.get('loop_song', False)
+        queue.loop_queue = state.get('loop_queue', False)
+        queue.volume = state.get('volume', Config.DEFAULT_VOLUME)
+        queue.eq = tuple(state.get('eq', (0.0, 0.0, 0.0)))
+        
+        track = track_from_data(state['current'])
+        try:
+            if not track.stream_valid() and not await YTDLSource.refresh(track):
+                logger.warning(f"Could not refresh stream for {track.query}, resuming with the next song")
+                track = None
+        except TemporaryFailure as e:
+            # play_next starts it from the top once extraction recovers
+            logger.warning(f"Could not refresh stream for {track.query} yet: {e}")
+            queue.insert(0, track)
+            track = None
+        
+        # Same timeouts, retries and single flight as a /play connect
+        voice_client = channel.guild.voice_client or await self._connect_voice(channel.guild, channel)
+        self.voice_clients[guild_id] = voice_client
+        
+        if track:
+            queue.current = track
+            self._start_playback(guild_id, voice_client, track, start=state.get('position', 0))
+        else:
+            await self.play_next(guild_id)
+    
+    @commands.Cog.listener()
+    async def on_voice_state_update(self, member: discord.Member, before: discord.VoiceState, after: discord.VoiceState):
+        """Pause when the last listener leaves and clean up when the bot is disconnected."""
+        guild_id = member.guild.id
+        if member.id == self.bot.user.id:
+            if after.channel is None:
+                self._drop_guild(guild_id)
+            return
+        
+        voice_client = self.voice_clients.get(guild_id)
+        if voice_client and voice_client.channel in (before.channel, after.channel):
+            await self._check_idle(guild_id)
+    
+    async def _run_reaper(self):
+        """Periodically disconnect idle voice clients and drop idle guild state."""
+        await self.bot.wait_until_ready()
+        while True:
+            await asyncio.sleep(Config.VOICE_SWEEP_INTERVAL)
+            for guild_id in set(self.voice_clients) | set(self.queues):
+                try:
+                    await self._check_idle(guild_id)
+                except Exception as e:
+                    logger.error(f"Error checking idle state of guild {guild_id}: {e}")
+    
+    async def _check_idle(self, guild_id: int):
+        """Pause, resume, disconnect or drop a guild depending on how long it has been idle."""
+        voice_client = self.voice_clients.get(guild_id)
+        now = time.monotonic()
+        
+        if not voice_client or not voice_client.is_connected():
+            # Keep settings around for a while in case music is started again
+            if now - self.idle_since.setdefault(guild_id, now) >= Config.VOICE_IDLE_TIMEOUT:
+                self._drop_guild(guild_id)
+            return
+        
+        if not any(not member.bot for member in voice_client.channel.members):
+            if voice_client.is_playing():
+                voice_client.pause()
+                self.paused_alone.add(guild_id)
+            if now - self.idle_since.setdefault(guild_id, now) >= Config.VOICE_ALONE_TIMEOUT:
+                await self._disconnect(guild_id, "nobody is listening")
+            return
+        
+        if guild_id in self.paused_alone:
+            self.paused_alone.discard(guild_id)
+            voice_client.resume()
+        
+        if voice_client.is_playing() or voice_client.is_paused() or guild_id in self.stalled:
+            self.idle_since.pop(guild_id, None)
+        elif now - self.idle_since.setdefault(guild_id, now) >= Config.VOICE_IDLE_TIMEOUT:
+            await self._disconnect(guild_id, "the queue ended")
+    
+    async def _disconnect(self, guild_id: int, reason: str):
+        """Leave the voice channel and drop the guild's state."""
+        voice_client = self.voice_clients.get(guild_id)
+        logger.info(f"Leaving voice in guild {guild_id}, {reason}")
+        if voice_client:
+            await voice_client.disconnect()
+        self._drop_guild(guild_id)
+    
+    def _drop_guild(self, guild_id: int):
+        """Forget all per-guild music state."""
+        self.prefetcher.cancel(guild_id)
+        self._cancel_imports(guild_id)
+        stalled = self.stalled.pop(guild_id, None)
+        if stalled:
+            stalled.cancel()
+        player = self.players.pop(guild_id, None)
+        if player:
+            player.close()
+        self.voice_clients.pop(guild_id, None)
+        self.queues.pop(guild_id, None)
+        self.idle_since.pop(guild_id, None)
+        self.paused_alone.discard(guild_id)
+        self.connect_latency.pop(guild_id, None)
+    
+    def resource_counts(self) -> Dict[str, int]:
+        """Count live voice connections, queues, FFmpeg processes, jitter buffer underruns and extraction failures."""
+        return {
+            'connections': sum(1 for vc in self.voice_clients.values() if vc.is_connected()),
+            'queues': len(self.queues),
+            'queued_tracks': sum(len(queue) for queue in self.queues.values()),
+            'players': len(self.players),
+            'player_mailbox_depth': sum(player.depth for player in self.players.values()),
+            'ffmpeg_processes': ffmpeg_process_count(),
+            # Underruns of the sources playing now, and since startup
+            'buffer_underruns': sum(source.underruns for source in list(BufferedSource.live)),
+            'total_buffer_underruns': BufferedSource.total_underruns,
+            'shared_listeners': broadcasts.shared_listeners,
+            'extraction_waiters': extractor.scheduler.waiters,
+            'failed_queries': len(failed_queries),
+            'extraction_circuit_trips': extractor.breaker.trips
+        }
+    
+    def connect_latencies(self) -> Dict[int, Dict[str, float]]:
+        """Get count and p50/p95 voice connect latency in milliseconds for every guild."""
+        return {
+            guild_id: {
+                'count': histogram.count,
+                'p50': histogram.percentile(50) * 1000,
+                'p95': histogram.percentile(95) * 1000
+            }
+            for guild_id, histogram in self.connect_latency.items()
+        }
     
     def get_queue(self, guild_id: int) -> MusicQueue:
         """Get or create queue for guild."""
@@ -181,22 +708,173 @@ class Music(commands.Cog):
             self.queues[guild_id] = MusicQueue()
         return self.queues[guild_id]
     
+    def get_player(self, guild_id: int) -> GuildPlayer:
+        """Get or create the player that serializes a guild's playback changes."""
+        if guild_id not in self.players:
+            self.players[guild_id] = GuildPlayer(guild_id, self.bot.loop)
+        return self.players[guild_id]
+    
+    def _voice_client(self, guild_id: int) -> Optional[discord.VoiceClient]:
+        """Get a guild's voice client, adopting one the bot is connected with but doesn't track yet."""
+        voice_client = self.voice_clients.get(guild_id)
+        if voice_client is None:
+            # E.g. the guild was dropped during a reconnect
+            guild = self.bot.get_guild(guild_id)
+            voice_client = guild.voice_client if guild else None
+            if voice_client is not None:
+                self.voice_clients[guild_id] = voice_client
+        return voice_client
+    
+    def _playing_source(self, guild_id: int) -> Optional[GaplessSource]:
+        """Get the source of the song playing or paused in a guild."""
+        voice_client = self.voice_clients.get(guild_id)
+        if not voice_client or not (voice_client.is_playing() or voice_client.is_paused()):
+            return None
+        source = voice_client.source
+        return source if isinstance(source, GaplessSource) else None
+    
+    def _post(self, guild_id: int, name: str, handler, *args):
+        """Send a command to a guild's player from the audio thread."""
+        player = self.players.get(guild_id)
+        if player:
+            player.post_threadsafe(name, handler, *args)
+    
+    def _after_playback(self, guild_id: int, error: Optional[Exception]):
+        """Advance the queue once playback stops, even after an error."""
+        if error:
+            logger.error(f"Player error in guild {guild_id}: {error}")
+        self._post(guild_id, 'advance', self.play_next, guild_id)
+    
     async def play_next(self, guild_id: int):
-        """Play next song in queue."""
+        """Play next song in queue; runs on the guild's player.
+        
+        While extraction is busy or failing upstream, the next song stays at
+        the head of the queue and is retried every `PLAY_RETRY_INTERVAL`
+        seconds instead of being skipped.
+        """
         queue = self.get_queue(guild_id)
-        voice_client = self.voice_clients.get(guild_id)
+        voice_client = self._voice_client(guild_id)
         
-        if not voice_client or not voice_client.is_connected():
+        while voice_client and voice_client.is_connected() and not self._playing_source(guild_id):
+            next_track = queue.peek_next()
+            if not next_track:
+                return
+            
+            trace = tracer.start('play_next', guild=guild_id)
+            # The prefetcher normally keeps this fresh; refresh just in time otherwise
+            if not next_track.stream_valid():
+                try:
+                    with span('refresh'):
+                        refreshed = await YTDLSource.refresh(next_track)
+                except TemporaryFailure as e:
+                    logger.warning(f"Could not refresh stream for {next_track.query}, retrying later: {e}")
+                    trace.finish()
+                    self._retry_play(guild_id)
+                    return
+                if queue.peek_next() is not next_track:
+                    # The queue changed while refreshing
+                    trace.finish()
+                    continue
+                if not refreshed:
+                    logger.warning(f"Could not refresh stream for {next_track.query}, skipping")
+                    trace.finish()
+                    if queue.loop_song:
+                        return
+                    queue.get_next()
+                    continue
+            queue.get_next()
+            if self._start_playback(guild_id, voice_client, next_track, trace) or queue.loop_song:
+                return
+    
+    def _retry_play(self, guild_id: int):
+        """Try starting the next song again once extraction has recovered."""
+        if guild_id in self.stalled:
             return
         
-        next_source = queue.get_next()
-        if next_source:
-            voice_client.play(
-                next_source,
-                after=lambda e: asyncio.run_coroutine_threadsafe(
-                    self.play_next(guild_id), self.bot.loop
-                ) if not e else logger.error(f"Player error: {e}")
-            )
+        async def retry():
+            try:
+                await asyncio.sleep(Config.PLAY_RETRY_INTERVAL)
+                while extractor.breaker.is_open:
+                    await asyncio.sleep(Config.PLAY_RETRY_INTERVAL)
+            finally:
+                if self.stalled.get(guild_id) is asyncio.current_task():
+                    del self.stalled[guild_id]
+            self._post(guild_id, 'advance', self.play_next, guild_id)
+        
+        self.stalled[guild_id] = asyncio.create_task(retry())
+    
+    def _start_playback(self, guild_id: int, voice_client: discord.VoiceClient, track: Track,
+                        trace: Optional[Trace] = None, start: float = 0):
+        """Open the audio pipeline for a track and start playing it."""
+        queue = self.get_queue(guild_id)
+        try:
+            with span('ffmpeg_spawn'):
+                source = YTDLSource.from_track(track, volume=queue.volume, eq=queue.eq, start=start)
+        except Exception as e:
+            logger.error(f"Error creating audio source: {e}")
+            if trace:
+                trace.finish()
+            return None
+        
+        on_first_frame = None
+        if trace:
+            playback_started = time.perf_counter()
+            
+            def on_first_frame():
+                # Runs on the audio thread; finish the trace back on the event loop
+                first_frame = time.perf_counter()
+                trace.record('first_audio', playback_started, first_frame)
+                self.bot.loop.call_soon_threadsafe(trace.finish, first_frame)
+        
+        # Later tracks are chained inside the source; `after` only fires once the queue runs dry
+        source = GaplessSource(
+            source,
+            track,
+            on_preopen=lambda: self._post(guild_id, 'preopen', self._preopen_next, guild_id),
+            on_transition=lambda next_track: self._post(guild_id, 'transition', self._on_transition, guild_id, next_track),
+            on_first_frame=on_first_frame
+        )
+        voice_client.play(source, after=lambda e: self._after_playback(guild_id, e))
+        title_index.record(track.title, track.webpage_url)
+        
+        # Resolve the next tracks while this one plays
+        self.prefetcher.schedule(guild_id, queue.upcoming(self.prefetcher.depth), max((track.duration or 0) - start, 0))
+        return source
+    
+    async def _preopen_next(self, guild_id: int):
+        """Open the next track's pipeline shortly before the current one ends; runs on the guild's player."""
+        queue = self.get_queue(guild_id)
+        gapless = self._playing_source(guild_id)
+        if not gapless:
+            return
+        
+        next_track = queue.peek_next()
+        if not next_track:
+            return
+        try:
+            if not next_track.stream_valid() and not await YTDLSource.refresh(next_track):
+                return
+        except TemporaryFailure as e:
+            # play_next tries again when the current song ends
+            logger.warning(f"Could not pre-open {next_track.query}: {e}")
+            return
+        
+        try:
+            source = YTDLSource.from_track(next_track, volume=queue.volume, eq=queue.eq)
+        except Exception as e:
+            logger.error(f"Error pre-opening next track: {e}")
+            return
+        gapless.set_next(source, next_track)
+    
+    async def _on_transition(self, guild_id: int, track: Track):
+        """Advance the queue after the gapless source switched tracks; runs on the guild's player."""
+        queue = self.get_queue(guild_id)
+        if queue.peek_next() is track:
+            queue.get_next()
+        else:
+            queue.current = track
+        
+        self.prefetcher.schedule(guild_id, queue.upcoming(self.prefetcher.depth), track.duration or 0)
     
     @commands.command(name='join')
     async def join(self, ctx):
@@ -210,16 +888,10 @@ class Music(commands.Cog):
     
     async def _join_voice(self, ctx_or_interaction):
         """Helper method for joining voice channel."""
-        if isinstance(ctx_or_interaction, discord.Interaction):
-            user = ctx_or_interaction.user
-            guild = ctx_or_interaction.guild
-            voice_client = guild.voice_client if guild else None
-            respond = ctx_or_interaction.response.send_message
-        else:
-            user = ctx_or_interaction.author
-            guild = ctx_or_interaction.guild
-            voice_client = ctx_or_interaction.voice_client
-            respond = lambda **kwargs: self.utils.safe_send(ctx_or_interaction, **kwargs)
+        reply = Responder(ctx_or_interaction, self.utils)
+        user = reply.user
+        guild = reply.guild
+        voice_client = guild.voice_client if guild else None
         
         if not hasattr(user, 'voice') or not user.voice:
             embed = self.utils.create_embed(
@@ -227,23 +899,93 @@ class Music(commands.Cog):
                 "You need to be in a voice channel to use this command.",
                 "error"
             )
-            return await respond(embed=embed)
+            return await reply.send(embed=embed)
         
         channel = user.voice.channel
         
         if voice_client:
             await voice_client.move_to(channel)
+            self.voice_clients[guild.id] = voice_client
         else:
-            voice_client = await channel.connect()
-            if guild:
-                self.voice_clients[guild.id] = voice_client
+            try:
+                await self._connect_voice(guild, channel)
+            except Exception as e:
+                logger.error(f"Could not join voice in guild {guild.id}: {e!r}")
+                return await reply.send(embed=self._join_failed_embed())
         
         embed = self.utils.create_embed(
             "✅ Joined Voice Channel",
             f"Connected to {channel.name}",
             "success"
         )
-        await respond(embed=embed)
+        await reply.send(embed=embed)
+    
+    def _join_failed_embed(self) -> discord.Embed:
+        return self.utils.create_embed(
+            "❌ Could Not Join",
+            "Couldn't connect to your voice channel, please try again.",
+            "error"
+        )
+    
+    async def _connect_voice(self, guild: discord.Guild, channel) -> discord.VoiceClient:
+        """Connect to a voice channel, sharing a connect already in flight for the guild."""
+        return await self.connects.run(str(guild.id), lambda: self._connect(guild, channel))
+    
+    async def _connect(self, guild: discord.Guild, channel) -> discord.VoiceClient:
+        """Connect with a timeout per attempt and exponential backoff between attempts."""
+        started = time.perf_counter()
+        for attempt in range(1, Config.VOICE_CONNECT_ATTEMPTS + 1):
+            try:
+                with span('voice_join'):
+                    voice_client = await channel.connect(timeout=Config.VOICE_CONNECT_TIMEOUT, reconnect=True)
+                break
+            except asyncio.CancelledError:
+                # Don't leave a half-open connection behind
+                if guild.voice_client:
+                    asyncio.ensure_future(guild.voice_client.disconnect(force=True))
+                raise
+            except discord.ClientException:
+                # Someone else connected this guild in the meantime
+                if guild.voice_client and guild.voice_client.is_connected():
+                    voice_client = guild.voice_client
+                    break
+                raise
+            except (asyncio.TimeoutError, discord.DiscordException, OSError) as e:
+                if guild.voice_client:
+                    await guild.voice_client.disconnect(force=True)
+                if attempt == Config.VOICE_CONNECT_ATTEMPTS:
+                    raise
+                delay = Config.VOICE_CONNECT_BACKOFF * 2 ** (attempt - 1)
+                logger.warning(f"Voice connect in guild {guild.id} failed ({e!r}), retrying in {delay:g}s")
+                await asyncio.sleep(delay)
+        
+        histogram = self.connect_latency.get(guild.id)
+        if histogram is None:
+            histogram = self.connect_latency[guild.id] = LatencyHistogram(64)
+        histogram.observe(time.perf_counter() - started)
+        self.voice_clients[guild.id] = voice_client
+        return voice_client
+    
+    async def _wait_voice(self, connecting: asyncio.Task, reply: Responder, trace: Trace) -> bool:
+        """Wait for a voice connect started alongside resolution, telling the user if it failed."""
+        try:
+            with span('voice_wait'):
+                await connecting
+            return True
+        except Exception as e:
+            logger.error(f"Could not join voice: {e!r}")
+            trace.finish()
+            await reply.edit(embed=self._join_failed_embed())
+            return False
+    
+    async def _abandon_voice(self, guild_id: int, connecting: asyncio.Task):
+        """Undo a voice connect made for a play that found nothing, unless something else uses it now."""
+        connecting.cancel()
+        await asyncio.wait([connecting])
+        if connecting.cancelled() or connecting.exception():
+            return
+        if not self._playing_source(guild_id) and not len(self.get_queue(guild_id)):
+            await self._disconnect(guild_id, "nothing was found to play")
     
     @commands.command(name='play', aliases=['p'])
     async def play(self, ctx, *, search: str):
@@ -255,18 +997,28 @@ class Music(commands.Cog):
         """Slash command: Play music."""
         await self._play_music(interaction, search)
     
-    async def _play_music(self, ctx_or_interaction, search: str):
-        """Helper method for playing music."""
-        if isinstance(ctx_or_interaction, discord.Interaction):
-            user = ctx_or_interaction.user
-            guild = ctx_or_interaction.guild
-            voice_client = guild.voice_client if guild else None
-            respond = ctx_or_interaction.response.send_message
-        else:
-            user = ctx_or_interaction.author
-            guild = ctx_or_interaction.guild
-            voice_client = ctx_or_interaction.voice_client
-            respond = lambda **kwargs: self.utils.safe_send(ctx_or_interaction, **kwargs)
+    @slash_play.autocomplete('search')
+    async def play_autocomplete(self, interaction: discord.Interaction, current: str) -> List[discord.app_commands.Choice[str]]:
+        """Suggest songs for /play from recent plays and a flat search."""
+        # Suggestions are background work, so they never delay the user's actual /play
+        current_request.set(ExtractionRequest(interaction.guild_id, interactive=False))
+        try:
+            suggestions = await suggester.suggest(interaction.user.id, current)
+        except Exception as e:
+            logger.error(f"Error building suggestions: {e}")
+            return []
+        
+        return [
+            discord.app_commands.Choice(name=title[:100], value=value)
+            for title, value in suggestions if len(value) <= 100
+        ]
+    
+    async def _play_music(self, ctx_or_interaction, search: str, track: Optional[Track] = None):
+        """Helper method for playing music; `track` skips resolving the search."""
+        reply = Responder(ctx_or_interaction, self.utils)
+        user = reply.user
+        guild = reply.guild
+        voice_client = guild.voice_client if guild else None
         
         if not hasattr(user, 'voice') or not user.voice:
             embed = self.utils.create_embed(
@@ -274,76 +1026,557 @@ class Music(commands.Cog):
                 "You need to be in a voice channel to play music.",
                 "error"
             )
-            return await respond(embed=embed)
+            return await reply.send(embed=embed)
+        
+        trace = tracer.start('play', guild=guild.id if guild else None, query=search)
+        current_request.set(ExtractionRequest(guild.id if guild else None, user.id))
         
-        # Join voice channel if not connected
-        if not voice_client:
-            await self._join_voice(ctx_or_interaction)
+        # Join the voice channel while the track resolves; playback starts once both are done
+        connecting = None
+        if voice_client:
+            self.voice_clients[guild.id] = voice_client
+        elif guild:
+            connecting = asyncio.ensure_future(self._connect_voice(guild, user.voice.channel))
+        
+        try:
+            # Create loading message
+            loading_embed = self.utils.create_embed(
+                "🔍 Searching...",
+                f"Searching for: `{search}`",
+                "music"
+            )
+            
+            await reply.send(embed=loading_embed)
+            
+            if track is None and guild and YTDLSource.is_playlist(search):
+                if connecting and not await self._wait_voice(connecting, reply, trace):
+                    return
+                self._start_import(guild.id, YTDLSource.playlist_pages(search), reply)
+                trace.finish()
+                return
+            
+            spotify_item = parse_spotify_url(search) if spotify else None
+            if track is None and guild and spotify_item and spotify_item[0] != 'track':
+                if connecting and not await self._wait_voice(connecting, reply, trace):
+                    return
+                self._start_import(guild.id, YTDLSource.spotify_pages(*spotify_item), reply)
+                trace.finish()
+                return
+            
+            # Resolve the track; the audio pipeline is only opened at playback time
+            error = None
+            if track is None:
+                # A song that goes into the queue only needs its formats once it is about to play
+                lazy = bool(guild and self._playing_source(guild.id))
+                try:
+                    with span('resolve'):
+                        track = await YTDLSource.resolve(search, loop=self.bot.loop, lazy=lazy)
+                except TemporaryFailure as e:
+                    error = e
+            
+            if not track:
+                trace.finish()
+                if connecting:
+                    await self._abandon_voice(guild.id, connecting)
+                embed = self._not_found_embed(search, error)
+                await reply.edit(embed=embed)
+                return
+            if connecting and not await self._wait_voice(connecting, reply, trace):
+                return
+            
             if guild:
-                voice_client = self.voice_clients.get(guild.id)
+                try:
+                    position = await self.get_player(guild.id).call('enqueue', self._enqueue, guild.id, track, trace, user.id)
+                except LookupError:
+                    embed = self._not_found_embed(search)
+                    await reply.edit(embed=embed)
+                    return
+                except TemporaryFailure as e:
+                    trace.finish()
+                    embed = self._not_found_embed(search, e)
+                    await reply.edit(embed=embed)
+                    return
+                except PlayerBusy:
+                    trace.finish()
+                    embed = self.utils.create_embed(
+                        "❌ Player Busy",
+                        "Too many music commands at once, please try again in a moment.",
+                        "error"
+                    )
+                    await reply.edit(embed=embed)
+                    return
+                except PlayerClosed:
+                    # The guild was dropped meanwhile, e.g. the bot was kicked from voice
+                    trace.finish()
+                    embed = self.utils.create_embed(
+                        "❌ Playback Stopped",
+                        "The bot left the voice channel before the song could be queued.",
+                        "error"
+                    )
+                    await reply.edit(embed=embed)
+                    return
+                
+                if position is None:
+                    embed = self.utils.create_embed(
+                        "🎵 Now Playing",
+                        f"**{track.title}**",
+                        "music"
+                    )
+                    if track.thumbnail:
+                        embed.set_thumbnail(url=track.thumbnail)
+                    if track.duration:
+                        embed.add_field(
+                            name="Duration",
+                            value=self.utils.format_duration(track.duration),
+                            inline=True
+                        )
+                    if track.uploader:
+                        embed.add_field(name="Uploader", value=track.uploader, inline=True)
+                else:
+                    embed = self.utils.create_embed(
+                        "✅ Added to Queue",
+                        f"**{track.title}**\nPosition in queue: {position}",
+                        "music"
+                    )
+                
+                await reply.edit(embed=embed)
         
-        # Create loading message
-        loading_embed = self.utils.create_embed(
-            "🔍 Searching...",
-            f"Searching for: `{search}`",
-            "music"
+        finally:
+            if connecting and not connecting.done():
+                # The command failed or was abandoned before it needed the connection
+                connecting.cancel()
+    
+    def _not_found_embed(self, search: str, error: Optional[Exception] = None) -> discord.Embed:
+        """Build the reply for a search that didn't resolve, telling apart a busy or failing extractor."""
+        if isinstance(error, ExtractorBusy):
+            return self.utils.create_embed(
+                "⏳ Busy",
+                "Too many songs are being looked up right now, please try again in a moment.",
+                "warning"
+            )
+        if error or extractor.breaker.is_open:
+            return self.utils.create_embed(
+                "⚠️ YouTube Unavailable",
+                "Looking up songs keeps failing right now, please try again in a minute.",
+                "warning"
+            )
+        return self.utils.create_embed(
+            "❌ Not Found",
+            f"Could not find: `{search}`",
+            "error"
         )
+    
+    async def _enqueue(self, guild_id: int, track: Track, trace: Optional[Trace] = None,
+                       user_id: Optional[int] = None) -> Optional[int]:
+        """Start playing a track, or queue it if something is playing; runs on the guild's player.
+        
+        Returns the track's position in the queue, or None if it started
+        playing. Raises LookupError if the track can't be resolved to play,
+        or TemporaryFailure if extraction is busy or failing.
+        """
+        current_trace.set(trace)
+        current_request.set(ExtractionRequest(guild_id, user_id))
+        queue = self.get_queue(guild_id)
+        voice_client = self._voice_client(guild_id)
+        
+        # If nothing is playing, start playing immediately
+        if voice_client and voice_client.is_connected() and not self._playing_source(guild_id):
+            # Flat search results get their formats extracted only now
+            if not track.stream_valid():
+                with span('refresh'):
+                    refreshed = await YTDLSource.refresh(track)
+                if not refreshed:
+                    if trace:
+                        trace.finish()
+                    raise LookupError(f"Could not resolve {track.query}")
+            queue.current = track
+            self._start_playback(guild_id, voice_client, track, trace)
+            return None
+        
+        queue.add(track)
+        if trace:
+            trace.finish()
+        gapless = self._playing_source(guild_id)
+        if gapless and gapless.wants_next():
+            # The current song is about to end and had nothing to pre-open
+            self.get_player(guild_id).post('preopen', self._preopen_next, guild_id)
+        if len(queue) <= self.prefetcher.depth:
+            current = queue.current
+            self.prefetcher.schedule(
+                guild_id, queue.upcoming(self.prefetcher.depth), current.duration if current and current.duration else 0
+            )
+        return len(queue)
+    
+    def _start_import(self, guild_id: int, pages: AsyncIterator[Tuple[Optional[str], List[Track]]], reply: Responder):
+        """Queue a playlist in the background as its pages are listed."""
+        task = asyncio.create_task(self._import_tracks(guild_id, pages, reply))
+        tasks = self.imports.setdefault(guild_id, set())
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+    
+    def _cancel_imports(self, guild_id: int):
+        """Stop any playlist still being imported into a guild's queue."""
+        for task in self.imports.pop(guild_id, set()):
+            task.cancel()
+    
+    async def _import_tracks(self, guild_id: int, pages: AsyncIterator[Tuple[Optional[str], List[Track]]],
+                             reply: Responder):
+        """Append pages of metadata-only tracks to the queue, reporting progress on one message."""
+        # Listing pages is not part of the /play trace this task was started from
+        current_trace.set(None)
+        name = None
+        queued = 0
+        last_update = time.monotonic()
         
-        if isinstance(ctx_or_interaction, discord.Interaction):
-            await respond(embed=loading_embed)
-            loading_msg = await ctx_or_interaction.original_response()
+        async def report(title: str, description: str, color_type: str = "music"):
+            await reply.edit(embed=self.utils.create_embed(title, description, color_type))
+        
+        try:
+            async for title, tracks in pages:
+                name = name or title
+                if not tracks:
+                    continue
+                # Playback starts as soon as the first entry resolves
+                await self.get_player(guild_id).call('extend', self._extend, guild_id, tracks)
+                queued += len(tracks)
+                
+                if time.monotonic() - last_update >= Config.IMPORT_PROGRESS_INTERVAL:
+                    last_update = time.monotonic()
+                    await report("📃 Importing Playlist", f"**{name or 'Playlist'}**\nQueued {queued} songs so far...")
+        except asyncio.CancelledError:
+            await report("⏹️ Import Stopped", f"**{name or 'Playlist'}**\nQueued {queued} songs before stopping.", "warning")
+            raise
+        except Exception as e:
+            logger.error(f"Error importing playlist into guild {guild_id}: {e}")
+            await report("❌ Import Failed", f"**{name or 'Playlist'}**\nQueued {queued} songs before an error.", "error")
+            return
+        
+        if queued:
+            await report("✅ Playlist Queued", f"**{name or 'Playlist'}**\nQueued {queued} songs.")
         else:
-            loading_msg = await respond(embed=loading_embed)
+            await report("❌ Not Found", "The playlist is empty or unavailable.", "error")
+    
+    async def _extend(self, guild_id: int, tracks: List[Track]) -> int:
+        """Append tracks to the queue and start playing if idle; runs on the guild's player."""
+        queue = self.get_queue(guild_id)
+        queue.extend(tracks)
+        
+        if not self._playing_source(guild_id):
+            await self.play_next(guild_id)
+        elif len(queue) - len(tracks) < self.prefetcher.depth:
+            current = queue.current
+            self.prefetcher.schedule(
+                guild_id, queue.upcoming(self.prefetcher.depth), current.duration if current and current.duration else 0
+            )
+        return len(queue)
+    
+    @commands.command(name='search', aliases=['find'])
+    async def search(self, ctx, *, query: str):
+        """Search for songs and pick one to play."""
+        await self._search(ctx, query)
+    
+    @discord.app_commands.command(name='search', description='Search for songs and pick one to play')
+    @discord.app_commands.describe(query='What to search for')
+    async def slash_search(self, interaction: discord.Interaction, query: str):
+        """Slash command: Search for songs."""
+        await self._search(interaction, query)
+    
+    async def _search(self, ctx_or_interaction, query: str):
+        """Helper method for searching songs with a selector."""
+        reply = Responder(ctx_or_interaction, self.utils)
+        user = reply.user
+        guild = reply.guild
+        
+        current_request.set(ExtractionRequest(guild.id if guild else None, user.id))
+        # Only metadata is fetched here; formats are extracted for the chosen song alone
+        error = None
+        try:
+            tracks = await YTDLSource.search(query, Config.SEARCH_RESULTS)
+        except TemporaryFailure as e:
+            error = e
+            tracks = []
+        except Exception as e:
+            logger.error(f"Error searching for {query}: {e}")
+            tracks = []
         
-        # Create audio source
-        source = await YTDLSource.create_source(search, loop=self.bot.loop)
+        if not tracks:
+            return await reply.send(embed=self._not_found_embed(query, error))
         
-        if not source:
+        lines = []
+        for i, track in enumerate(tracks, 1):
+            duration = f" ({self.utils.format_duration(track.duration)})" if track.duration else ""
+            lines.append(f"**{i}.** {track.title}{duration}")
+        embed = self.utils.create_embed(
+            f"🔍 Results for: {query}"[:256],
+            "\n".join(lines),
+            "music"
+        )
+        await reply.send(embed=embed, view=SearchView(self, user.id, tracks))
+    
+    @commands.command(name='volume', aliases=['vol'])
+    async def volume(self, ctx, volume: int):
+        """Set the playback volume."""
+        await self._set_volume(ctx, volume)
+    
+    @discord.app_commands.command(name='volume', description='Set the playback volume')
+    @discord.app_commands.describe(volume='Volume from 1 to 100')
+    async def slash_volume(self, interaction: discord.Interaction, volume: int):
+        """Slash command: Set the playback volume."""
+        await self._set_volume(interaction, volume)
+    
+    async def _set_volume(self, ctx_or_interaction, volume: int):
+        """Helper method for setting the volume."""
+        reply = Responder(ctx_or_interaction, self.utils)
+        guild = reply.guild
+        
+        if not guild or not 1 <= volume <= Config.MAX_VOLUME:
             embed = self.utils.create_embed(
-                "❌ Not Found",
-                f"Could not find: `{search}`",
+                "❌ Invalid Volume",
+                f"Volume must be between 1 and {Config.MAX_VOLUME}.",
                 "error"
             )
-            if loading_msg:
-                await loading_msg.edit(embed=embed)
+            return await reply.send(embed=embed)
+        
+        await self.get_player(guild.id).call('volume', self._apply_filters, guild.id, volume, None)
+        
+        embed = self.utils.create_embed(
+            "🔊 Volume Set",
+            f"Volume set to {volume}%",
+            "music"
+        )
+        await reply.send(embed=embed)
+    
+    @commands.command(name='eq', aliases=['equalizer'])
+    async def equalizer(self, ctx, bass: float = 0.0, mid: float = 0.0, treble: float = 0.0):
+        """Set the equalizer bands in dB."""
+        await self._set_eq(ctx, bass, mid, treble)
+    
+    @discord.app_commands.command(name='eq', description='Set the equalizer bands')
+    @discord.app_commands.describe(bass='Bass in dB', mid='Mids in dB', treble='Treble in dB')
+    async def slash_equalizer(self, interaction: discord.Interaction, bass: float = 0.0, mid: float = 0.0, treble: float = 0.0):
+        """Slash command: Set the equalizer bands."""
+        await self._set_eq(interaction, bass, mid, treble)
+    
+    async def _set_eq(self, ctx_or_interaction, bass: float, mid: float, treble: float):
+        """Helper method for setting the equalizer."""
+        reply = Responder(ctx_or_interaction, self.utils)
+        guild = reply.guild
+        
+        bands = (bass, mid, treble)
+        if not guild or any(abs(band) > Config.MAX_EQ_GAIN for band in bands):
+            embed = self.utils.create_embed(
+                "❌ Invalid Equalizer",
+                f"Each band must be between -{Config.MAX_EQ_GAIN} and {Config.MAX_EQ_GAIN} dB.",
+                "error"
+            )
+            return await reply.send(embed=embed)
+        
+        await self.get_player(guild.id).call('eq', self._apply_filters, guild.id, None, bands)
+        
+        embed = self.utils.create_embed(
+            "🎚️ Equalizer Set",
+            f"Bass: {bass:+g} dB | Mid: {mid:+g} dB | Treble: {treble:+g} dB",
+            "music"
+        )
+        await reply.send(embed=embed)
+    
+    async def _apply_filters(self, guild_id: int, volume: Optional[int] = None,
+                             eq: Optional[Tuple[float, float, float]] = None):
+        """Update the guild's volume or EQ and apply it to the playing source; runs on the guild's player."""
+        queue = self.get_queue(guild_id)
+        if volume is not None:
+            queue.volume = volume
+        if eq is not None:
+            queue.eq = eq
+        
+        gapless = self._playing_source(guild_id)
+        if not gapless:
             return
         
-        if guild:
-            queue = self.get_queue(guild.id)
-            
-            # If nothing is playing, start playing immediately
-            if voice_client and not voice_client.is_playing():
-                queue.current = source
-                voice_client.play(
-                    source,
-                    after=lambda e: asyncio.run_coroutine_threadsafe(
-                        self.play_next(guild.id), self.bot.loop
-                    ) if not e else logger.error(f"Player error: {e}")
-                )
-                
-                embed = self.utils.create_embed(
-                    "🎵 Now Playing",
-                    f"**{source.title}**",
-                    "music"
-                )
-                if source.thumbnail:
-                    embed.set_thumbnail(url=source.thumbnail)
-                if source.duration:
-                    embed.add_field(
-                        name="Duration",
-                        value=self.utils.format_duration(source.duration),
-                        inline=True
-                    )
-                if source.uploader:
-                    embed.add_field(name="Uploader", value=source.uploader, inline=True)
-            else:
-                # Add to queue
-                queue.add(source)
+        source = gapless.current
+        if isinstance(source, YTDLSource):
+            source.volume = queue.volume / Config.DEFAULT_VOLUME
+            source.chain.set_eq(queue.eq)
+        elif getattr(source, 'filters', None) != YTDLSource.filter_key(gapless.track, queue.volume, queue.eq):
+            # Passthrough and shared pipelines can't change in place; reopen at the same position
+            gapless.replace_current(YTDLSource.from_track(
+                gapless.track, volume=queue.volume, eq=queue.eq, start=source.position
+            ))
+        # A pre-opened next track was built for the old settings
+        gapless.discard_next()
+    
+    @commands.command(name='seek')
+    async def seek(self, ctx, position: str):
+        """Seek to a position in the current song."""
+        await self._seek(ctx, position=position)
+    
+    @discord.app_commands.command(name='seek', description='Seek to a position in the current song')
+    @discord.app_commands.describe(position='Position as seconds or MM:SS')
+    async def slash_seek(self, interaction: discord.Interaction, position: str):
+        """Slash command: Seek in the current song."""
+        await self._seek(interaction, position=position)
+    
+    @commands.command(name='forward', aliases=['ff'])
+    async def forward(self, ctx, seconds: int = 10):
+        """Skip forward in the current song."""
+        await self._seek(ctx, offset=seconds)
+    
+    @discord.app_commands.command(name='forward', description='Skip forward in the current song')
+    @discord.app_commands.describe(seconds='Seconds to skip forward')
+    async def slash_forward(self, interaction: discord.Interaction, seconds: int = 10):
+        """Slash command: Skip forward."""
+        await self._seek(interaction, offset=seconds)
+    
+    @commands.command(name='rewind', aliases=['rw'])
+    async def rewind(self, ctx, seconds: int = 10):
+        """Rewind the current song."""
+        await self._seek(ctx, offset=-seconds)
+    
+    @discord.app_commands.command(name='rewind', description='Rewind the current song')
+    @discord.app_commands.describe(seconds='Seconds to rewind')
+    async def slash_rewind(self, interaction: discord.Interaction, seconds: int = 10):
+        """Slash command: Rewind."""
+        await self._seek(interaction, offset=-seconds)
+    
+    async def _seek(self, ctx_or_interaction, *, position: Optional[str] = None, offset: int = 0):
+        """Helper method for seeking to an absolute position or by an offset."""
+        reply = Responder(ctx_or_interaction, self.utils)
+        guild = reply.guild
+        
+        target = None
+        if position is not None:
+            target = self.utils.parse_duration(position)
+            if target is None:
                 embed = self.utils.create_embed(
-                    "✅ Added to Queue",
-                    f"**{source.title}**\nPosition in queue: {len(queue.queue)}",
-                    "music"
+                    "❌ Invalid Position",
+                    "Use seconds or `MM:SS`, for example `90` or `1:30`.",
+                    "error"
                 )
-            
-            if loading_msg:
-                await loading_msg.edit(embed=embed)
+                return await reply.send(embed=embed)
+        
+        result = await self.get_player(guild.id).call('seek', self._seek_to, guild.id, target, offset) if guild else None
+        if not result:
+            embed = self.utils.create_embed(
+                "❌ Nothing Playing",
+                "There is no song playing right now.",
+                "error"
+            )
+            return await reply.send(embed=embed)
+        
+        track, target = result
+        embed = self.utils.create_embed(
+            "⏩ Seeked",
+            f"**{track.title}**\nNow at {self.utils.format_duration(int(target))}"
+            + (f" / {self.utils.format_duration(track.duration)}" if track.duration else ""),
+            "music"
+        )
+        await reply.send(embed=embed)
+    
+    async def _seek_to(self, guild_id: int, position: Optional[float], offset: float = 0) -> Optional[Tuple[Track, float]]:
+        """Reopen the current track at a position, or offset from the current one; runs on the guild's player.
+        
+        Uses the track's resolved stream URL. Returns the track and the
+        position actually seeked to, or None if nothing is playing.
+        """
+        queue = self.get_queue(guild_id)
+        gapless = self._playing_source(guild_id)
+        if not gapless:
+            return None
+        
+        track = gapless.track
+        if position is None:
+            position = getattr(gapless.current, 'position', 0) + offset
+        position = max(position, 0)
+        if track.duration:
+            position = min(position, track.duration)
+        
+        # Only pay for extraction when the signed stream URL has expired
+        if not track.stream_valid():
+            try:
+                await YTDLSource.refresh(track)
+            except TemporaryFailure as e:
+                logger.warning(f"Seeking {track.query} with its old stream URL: {e}")
+        
+        with span('seek'):
+            source = YTDLSource.from_track(track, volume=queue.volume, eq=queue.eq, start=position)
+        gapless.replace_current(source)
+        # The pre-open window moved with the position
+        gapless.discard_next()
+        return track, position
+    
+    @commands.command(name='skip', aliases=['s'])
+    async def skip(self, ctx):
+        """Skip the current song."""
+        await self._skip(ctx)
+    
+    @discord.app_commands.command(name='skip', description='Skip the current song')
+    async def slash_skip(self, interaction: discord.Interaction):
+        """Slash command: Skip the current song."""
+        await self._skip(interaction)
+    
+    async def _skip(self, ctx_or_interaction):
+        """Helper method for skipping the current song."""
+        reply = Responder(ctx_or_interaction, self.utils)
+        guild = reply.guild
+        
+        track = await self.get_player(guild.id).call('skip', self._skip_track, guild.id) if guild else None
+        if not track:
+            embed = self.utils.create_embed(
+                "❌ Nothing Playing",
+                "There is no song playing right now.",
+                "error"
+            )
+            return await reply.send(embed=embed)
+        
+        embed = self.utils.create_embed(
+            "⏭️ Skipped",
+            f"**{track.title}**",
+            "music"
+        )
+        await reply.send(embed=embed)
+    
+    async def _skip_track(self, guild_id: int) -> Optional[Track]:
+        """Stop the current song so the next one starts; runs on the guild's player."""
+        gapless = self._playing_source(guild_id)
+        if not gapless:
+            return None
+        
+        track = gapless.track
+        # The player's `after` callback advances the queue
+        gapless.discard_next()
+        self.voice_clients[guild_id].stop()
+        return track
+    
+    @commands.command(name='stop')
+    async def stop(self, ctx):
+        """Stop the music and clear the queue."""
+        await self._stop(ctx)
+    
+    @discord.app_commands.command(name='stop', description='Stop the music and clear the queue')
+    async def slash_stop(self, interaction: discord.Interaction):
+        """Slash command: Stop the music."""
+        await self._stop(interaction)
+    
+    async def _stop(self, ctx_or_interaction):
+        """Helper method for stopping the music."""
+        reply = Responder(ctx_or_interaction, self.utils)
+        guild = reply.guild
+        
+        if guild:
+            await self.get_player(guild.id).call('stop', self._stop_playback, guild.id)
+        
+        embed = self.utils.create_embed(
+            "⏹️ Stopped",
+            "Music stopped and the queue was cleared.",
+            "music"
+        )
+        await reply.send(embed=embed)
+    
+    async def _stop_playback(self, guild_id: int):
+        """Clear the queue and stop playing; runs on the guild's player."""
+        self._cancel_imports(guild_id)
+        self.get_queue(guild_id).clear()
+        self.prefetcher.cancel(guild_id)
+        voice_client = self.voice_clients.get(guild_id)
+        if voice_client:
+            voice_client.stop()
@@ -0,0 +1,191 @@
+"""
+Play queue for the music module.
+"""
+
+import random
+from collections import deque
+from itertools import chain, islice
+from math import isqrt
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+from .config import Config
+from .track import Track
+
+# Smallest block size; blocks grow with the square root of the queue length. Walking
+# the blocks runs in Python and shifting a block in C, so blocks are kept large.
+MIN_BLOCK_SIZE = 256
+BLOCK_SCALE = 16
+
+class MusicQueue:
+    """Music queue management.
+    
+    Queued tracks are kept in a list of deque blocks of O(sqrt(n)) tracks
+    each. Advancing pops from the front of the first block and enqueueing
+    appends to the last, both O(1). Positional edits find their block by
+    walking the block lengths from the nearer end and then shift one block,
+    so insert, remove and move cost O(sqrt(n)) instead of O(n); a balanced
+    tree would get them to O(log n), but walking a few hundred block
+    lengths is cheaper than its per-node overhead at queue sizes the bot
+    sees. Shuffle is O(n). Played tracks go into a bounded history ring.
+    """
+    
+    def __init__(self, history_size: Optional[int] = None):
+        self.blocks: List[Deque[Track]] = []
+        self.size = 0
+        self.history: Deque[Track] = deque(maxlen=history_size if history_size is not None else Config.QUEUE_HISTORY_SIZE)
+        self.current: Optional[Track] = None
+        self.loop_song = False
+        self.loop_queue = False
+        self.volume = Config.DEFAULT_VOLUME
+        self.eq = (0.0, 0.0, 0.0)
+        # Bumped whenever the queued tracks change
+        self.revision = 0
+    
+    def __len__(self) -> int:
+        return self.size
+    
+    def __iter__(self) -> Iterator[Track]:
+        """Iterate over the queued songs in play order."""
+        return chain.from_iterable(self.blocks)
+    
+    @property
+    def block_size(self) -> int:
+        """Length at which a block is split in two; appends start a new block at half of it."""
+        return max(MIN_BLOCK_SIZE, BLOCK_SCALE * isqrt(self.size))
+    
+    def _append(self, track: Track):
+        if not self.blocks or len(self.blocks[-1]) >= self.block_size // 2:
+            self.blocks.append(deque())
+        self.blocks[-1].append(track)
+        self.size += 1
+    
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """Find the block holding a position and the offset within it."""
+        if index < self.size // 2:
+            for number, length in enumerate(map(len, self.blocks)):
+                if index < length:
+                    return number, index
+                index -= length
+        else:
+            # Count back from the end
+            index -= self.size
+            for number in range(len(self.blocks) - 1, -1, -1):
+                index += len(self.blocks[number])
+                if index >= 0:
+                    return number, index
+        raise IndexError('queue index out of range')
+    
+    def _normalize(self, index: int) -> int:
+        if not -self.size <= index < self.size:
+            raise IndexError('queue index out of range')
+        return index % self.size
+    
+    def add(self, track: Track):
+        """Add song to queue."""
+        self._append(track)
+        self.revision += 1
+    
+    def extend(self, tracks: Iterable[Track]):
+        """Add songs to the end of the queue."""
+        tracks = list(tracks)
+        self.size += len(tracks)
+        size = self.block_size // 2
+        if self.blocks:
+            room = max(size - len(self.blocks[-1]), 0)
+            self.blocks[-1].extend(tracks[:room])
+            tracks = tracks[room:]
+        self.blocks.extend(deque(tracks[start:start + size]) for start in range(0, len(tracks), size))
+        self.revision += 1
+    
+    def insert(self, index: int, track: Track):
+        """Add song at a position in the queue, 0 being next; positions past the end append."""
+        if index < 0:
+            index = max(self.size + index, 0)
+        if index >= self.size:
+            self.add(track)
+            return
+        
+        number, offset = self._locate(index)
+        block = self.blocks[number]
+        block.insert(offset, track)
+        self.size += 1
+        if len(block) > self.block_size:
+            half = len(block) // 2
+            self.blocks[number:number + 1] = [deque(islice(block, half)), deque(islice(block, half, None))]
+        self.revision += 1
+    
+    def remove(self, index: int) -> Track:
+        """Remove and return the song at a position in the queue."""
+        number, offset = self._locate(self._normalize(index))
+        block = self.blocks[number]
+        track = block[offset]
+        del block[offset]
+        if not block:
+            del self.blocks[number]
+        elif number + 1 < len(self.blocks) and len(block) + len(self.blocks[number + 1]) <= self.block_size // 2:
+            # Merge blocks that shrank so lookups don't walk many small ones
+            block.extend(self.blocks.pop(number + 1))
+        self.size -= 1
+        self.revision += 1
+        return track
+    
+    def move(self, source: int, destination: int) -> Track:
+        """Move a song to another position in the queue."""
+        track = self.remove(source)
+        self.insert(destination, track)
+        return track
+    
+    def shuffle(self):
+        """Shuffle the queued songs."""
+        tracks = list(self)
+        random.shuffle(tracks)
+        self.blocks = []
+        self.size = 0
+        self.extend(tracks)
+    
+    def get_next(self) -> Optional[Track]:
+        """Get next song from queue."""
+        if self.loop_song and self.current:
+            return self.current
+        
+        if not self.size:
+            return None
+        
+        # Pop from the front without the merge check of `remove`, so advancing stays O(1)
+        block = self.blocks[0]
+        next_song = block.popleft()
+        if not block:
+            del self.blocks[0]
+        self.size -= 1
+        self.revision += 1
+        
+        if self.current:
+            self.history.append(self.current)
+            if self.loop_queue:
+                self._append(self.current)
+        
+        self.current = next_song
+        return next_song
+    
+    def peek_next(self) -> Optional[Track]:
+        """Get the song that will play next, without advancing."""
+        if self.loop_song and self.current:
+            return self.current
+        return self.blocks[0][0] if self.blocks else None
+    
+    def upcoming(self, count: int) -> List[Track]:
+        """Get the next tracks that will play, without advancing."""
+        if self.loop_song:
+            return []
+        return list(islice(self, count))
+    
+    def clear(self):
+        """Clear the queue."""
+        self.blocks = []
+        self.size = 0
+        self.current = None
+        self.revision += 1
+    
+    def skip(self) -> Optional[Track]:
+        """Skip current song."""
+        return self.get_next()
@@ -7,10 +7,16 @@ from typing import Optional
 import discord
 from discord.ext import commands
 from .config import Config
+from .responder import Responder
+from .tracing import tracer
 from .utils import Utils
 
 logger = logging.getLogger(__name__)
 
+def owner_only():
+    """Restrict a slash command to the bot owner; `cog_check` only covers prefix commands."""
+    return discord.app_commands.check(lambda interaction: Config.is_owner(interaction.user.id))
+
 class Owner(commands.Cog):
     """Owner-only commands cog."""
     
@@ -22,12 +28,23 @@ class Owner(commands.Cog):
         """Check if user is the bot owner."""
         return Config.is_owner(ctx.author.id)
     
+    async def cog_app_command_error(self, interaction: discord.Interaction, error: discord.app_commands.AppCommandError):
+        """Tell users who aren't the owner that they can't use these slash commands."""
+        if isinstance(error, discord.app_commands.CheckFailure):
+            embed = self.utils.create_embed(
+                "❌ Access Denied",
+                "Only the bot owner can use this command.",
+                "error"
+            )
+            await Responder(interaction, self.utils).send(embed=embed)
+    
     @commands.command(name='gban', aliases=['globalban'])
     async def global_ban(self, ctx, user_id: int, *, reason: str = "No reason provided"):
         """Globally ban a user from all servers the bot is in."""
         await self._global_ban(ctx, user_id, reason)
     
     @discord.app_commands.command(name='gban', description='Globally ban a user from all servers')
+    @owner_only()
     @discord.app_commands.describe(user_id='User ID to ban globally', reason='Reason for the ban')
     async def slash_global_ban(self, interaction: discord.Interaction, user_id: str, reason: str = "No reason provided"):
         """Slash command: Globally ban a user."""
@@ -40,16 +57,11 @@ class Owner(commands.Cog):
                 "Please provide a valid numeric user ID.",
                 "error"
             )
-            await interaction.response.send_message(embed=embed)
+            await Responder(interaction, self.utils).send(embed=embed)
     
     async def _global_ban(self, ctx_or_interaction, user_id: int, reason: str):
         """Helper method for global ban."""
-        if isinstance(ctx_or_interaction, discord.Interaction):
-            respond = ctx_or_interaction.response.send_message
-            edit_response = ctx_or_interaction.edit_original_response
-        else:
-            respond = lambda **kwargs: self.utils.safe_send(ctx_or_interaction, **kwargs)
-            edit_response = lambda **kwargs: None
+        reply = Responder(ctx_or_interaction, self.utils)
         
         try:
             user = await self.bot.fetch_user(user_id)
@@ -59,7 +71,7 @@ class Owner(commands.Cog):
                 f"Could not find user with ID: {user_id}",
                 "error"
             )
-            return await respond(embed=embed)
+            return await reply.send(embed=embed)
         
         if Config.is_owner(user.id):
             embed = self.utils.create_embed(
@@ -67,7 +79,7 @@ class Owner(commands.Cog):
                 "You cannot globally ban yourself.",
                 "error"
             )
-            return await respond(embed=embed)
+            return await reply.send(embed=embed)
         
         banned_count = 0
         failed_count = 0
@@ -77,7 +89,7 @@ class Owner(commands.Cog):
             f"Attempting to ban **{user.name}** from all servers...",
             "warning"
         )
-        await respond(embed=status_embed)
+        await reply.send(embed=status_embed)
         
         for guild in self.bot.guilds:
             try:
@@ -111,10 +123,8 @@ class Owner(commands.Cog):
         )
         embed.set_thumbnail(url=user.display_avatar.url)
         
-        if isinstance(ctx_or_interaction, discord.Interaction):
-            await edit_response(embed=embed)
-        else:
-            await respond(embed=embed)
+        # Replaces the progress message
+        await reply.edit(embed=embed)
     
     @commands.command(name='servers', aliases=['guilds'])
     async def list_servers(self, ctx):
@@ -122,16 +132,14 @@ class Owner(commands.Cog):
         await self._list_servers(ctx)
     
     @discord.app_commands.command(name='servers', description='List all servers the bot is in')
+    @owner_only()
     async def slash_list_servers(self, interaction: discord.Interaction):
         """Slash command: List servers."""
         await self._list_servers(interaction)
     
     async def _list_servers(self, ctx_or_interaction):
         """Helper method for listing servers."""
-        if isinstance(ctx_or_interaction, discord.Interaction):
-            respond = ctx_or_interaction.response.send_message
-        else:
-            respond = lambda **kwargs: self.utils.safe_send(ctx_or_interaction, **kwargs)
+        reply = Responder(ctx_or_interaction, self.utils)
         
         guilds = self.bot.guilds
         
@@ -141,7 +149,7 @@ class Owner(commands.Cog):
                 "Bot is not in any servers.",
                 "info"
             )
-            return await respond(embed=embed)
+            return await reply.send(embed=embed)
         
         sorted_guilds = sorted(guilds, key=lambda g: g.member_count, reverse=True)
         
@@ -167,7 +175,101 @@ class Owner(commands.Cog):
                 inline=False
             )
         
-        await respond(embed=embed)
+        await reply.send(embed=embed)
+    
+    @commands.command(name='latency', aliases=['traces'])
+    async def latency(self, ctx):
+        """Show play pipeline latency percentiles and the slowest traces."""
+        await self._latency(ctx)
+    
+    @discord.app_commands.command(name='latency', description='Show play pipeline latency stats')
+    @owner_only()
+    async def slash_latency(self, interaction: discord.Interaction):
+        """Slash command: Show latency stats."""
+        await self._latency(interaction)
+    
+    async def _latency(self, ctx_or_interaction):
+        """Helper method for showing latency stats."""
+        reply = Responder(ctx_or_interaction, self.utils)
+        
+        summary = tracer.summary()
+        if not summary:
+            embed = self.utils.create_embed(
+                "⏱️ Latency",
+                "No traces recorded yet.",
+                "info"
+            )
+            return await reply.send(embed=embed)
+        
+        lines = [
+            f"`{stage:<18}` n={stats['count']} | p50 {stats['p50']:.0f} ms | "
+            f"p95 {stats['p95']:.0f} ms | p99 {stats['p99']:.0f} ms"
+            for stage, stats in summary.items()
+        ]
+        embed = self.utils.create_embed(
+            "⏱️ Latency",
+            "\n".join(lines)[:4096],
+            "info"
+        )
+        
+        music = self.bot.get_cog('Music')
+        connects = music.connect_latencies() if music else {}
+        if connects:
+            slowest = sorted(connects.items(), key=lambda item: item[1]['p95'], reverse=True)[:5]
+            embed.add_field(
+                name="🔊 Voice connect, slowest guilds",
+                value="\n".join(
+                    f"`{guild_id}` n={stats['count']} | p50 {stats['p50']:.0f} ms | p95 {stats['p95']:.0f} ms"
+                    for guild_id, stats in slowest
+                ),
+                inline=False
+            )
+        
+        for trace in tracer.slowest_traces()[:3]:
+            spans = "\n".join(
+                f"+{offset * 1000:.0f} ms `{stage}` {duration * 1000:.0f} ms"
+                for stage, offset, duration in trace.spans
+            )
+            embed.add_field(
+                name=f"🐢 {trace.name} - {trace.total * 1000:.0f} ms",
+                value=(spans or "No stages recorded")[:1024],
+                inline=False
+            )
+        
+        embed.set_footer(text=f"Full traces are written to {tracer.path}")
+        await reply.send(embed=embed)
+    
+    @commands.command(name='resources', aliases=['res'])
+    async def resources(self, ctx):
+        """Show live voice connections, queues and FFmpeg processes."""
+        await self._resources(ctx)
+    
+    @discord.app_commands.command(name='resources', description='Show live voice and audio resources')
+    @owner_only()
+    async def slash_resources(self, interaction: discord.Interaction):
+        """Slash command: Show live resources."""
+        await self._resources(interaction)
+    
+    async def _resources(self, ctx_or_interaction):
+        """Helper method for showing live resources."""
+        reply = Responder(ctx_or_interaction, self.utils)
+        
+        music = self.bot.get_cog('Music')
+        if not music:
+            embed = self.utils.create_embed(
+                "❌ Music Not Loaded",
+                "The music module is not loaded.",
+                "error"
+            )
+            return await reply.send(embed=embed)
+        
+        counts = music.resource_counts()
+        embed = self.utils.create_embed(
+            "📊 Resources",
+            "\n".join(f"**{name.replace('_', ' ').capitalize()}:** {count}" for name, count in counts.items()),
+            "info"
+        )
+        await reply.send(embed=embed)
     
     @commands.command(name='shutdown')
     async def shutdown(self, ctx):
@@ -175,25 +277,22 @@ class Owner(commands.Cog):
         await self._shutdown(ctx)
     
     @discord.app_commands.command(name='shutdown', description='Shutdown the bot')
+    @owner_only()
     async def slash_shutdown(self, interaction: discord.Interaction):
         """Slash command: Shutdown the bot."""
         await self._shutdown(interaction)
     
     async def _shutdown(self, ctx_or_interaction):
         """Helper method for shutting down the bot."""
-        if isinstance(ctx_or_interaction, discord.Interaction):
-            author = ctx_or_interaction.user
-            respond = ctx_or_interaction.response.send_message
-        else:
-            author = ctx_or_interaction.author
-            respond = lambda **kwargs: self.utils.safe_send(ctx_or_interaction, **kwargs)
+        reply = Responder(ctx_or_interaction, self.utils)
+        author = reply.user
         
         embed = self.utils.create_embed(
             "🔄 Shutting Down",
             "Bot is shutting down...",
             "warning"
         )
-        await respond(embed=embed)
+        await reply.send(embed=embed)
         
         logger.info(f"Bot shutdown initiated by owner {author}")
         await self.bot.close()
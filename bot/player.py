@@ -0,0 +1,111 @@
+"""
+Per-guild player actor for the music module.
+
+Every change to a guild's playback (enqueueing, advancing, seeking, filter
+changes, stopping) is sent to that guild's player as a command and applied
+one at a time by a single long-lived task, so commands and audio thread
+callbacks never race each other.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Optional
+
+from .config import Config
+from .scheduler import ExtractionRequest, current_request
+from .tracing import current_trace
+
+logger = logging.getLogger(__name__)
+
+class PlayerBusy(Exception):
+    """Raised when a player's mailbox stays full for too long."""
+
+class PlayerClosed(Exception):
+    """Raised for commands still waiting or running when a player is closed."""
+
+class GuildPlayer:
+    """Serializes a guild's playback commands through a bounded mailbox.
+    
+    `call` waits for room in the mailbox, applying backpressure to commands,
+    and returns the command's result. `post_threadsafe` is for callbacks on
+    the audio thread that don't wait for a result. Commands that haven't
+    finished when the player is closed fail with PlayerClosed.
+    """
+    
+    def __init__(self, guild_id: int, loop: asyncio.AbstractEventLoop, *, size: Optional[int] = None):
+        self.guild_id = guild_id
+        self.loop = loop
+        self.mailbox: asyncio.Queue = asyncio.Queue(maxsize=size or Config.PLAYER_MAILBOX_SIZE)
+        self.processed = 0
+        self.failures = 0
+        self.closed = False
+        self.task = loop.create_task(self._run())
+    
+    @property
+    def depth(self) -> int:
+        """Number of commands waiting in the mailbox."""
+        return self.mailbox.qsize()
+    
+    async def call(self, name: str, handler: Callable[..., Awaitable[Any]], *args: Any,
+                   timeout: Optional[float] = None) -> Any:
+        """Send a command and wait for its result."""
+        if self.closed:
+            raise PlayerClosed(f"Player for guild {self.guild_id} is closed")
+        future = self.loop.create_future()
+        try:
+            await asyncio.wait_for(
+                self.mailbox.put((name, handler, args, future)),
+                timeout if timeout is not None else Config.PLAYER_SUBMIT_TIMEOUT
+            )
+        except asyncio.TimeoutError:
+            raise PlayerBusy(f"Player for guild {self.guild_id} is busy")
+        if self.closed:
+            # Closed while waiting for room; nothing will run the command
+            raise PlayerClosed(f"Player for guild {self.guild_id} is closed")
+        return await future
+    
+    def post(self, name: str, handler: Callable[..., Awaitable[Any]], *args: Any):
+        """Send a command without waiting for it."""
+        # Internal events wait for room instead of being dropped
+        asyncio.ensure_future(self.mailbox.put((name, handler, args, None)))
+    
+    def post_threadsafe(self, name: str, handler: Callable[..., Awaitable[Any]], *args: Any):
+        """Send a command from another thread, e.g. the audio thread."""
+        if not self.loop.is_closed():
+            self.loop.call_soon_threadsafe(self.post, name, handler, *args)
+    
+    async def _run(self):
+        """Apply commands one at a time, for as long as the guild has a player."""
+        while True:
+            name, handler, args, future = await self.mailbox.get()
+            # Don't attribute this command's stages or extractions to an earlier command
+            current_trace.set(None)
+            current_request.set(ExtractionRequest(self.guild_id))
+            try:
+                if future is None or not future.cancelled():
+                    result = await handler(*args)
+                    if future is not None and not future.done():
+                        future.set_result(result)
+                self.processed += 1
+            except asyncio.CancelledError:
+                # The caller gets an answer instead of being cancelled along with the player
+                if future is not None and not future.done():
+                    future.set_exception(PlayerClosed(f"Player for guild {self.guild_id} was closed"))
+                raise
+            except Exception as e:
+                # A failed command must not stall the guild's playback
+                self.failures += 1
+                logger.error(f"Player command {name} failed in guild {self.guild_id}: {e}")
+                if future is not None and not future.done():
+                    future.set_exception(e)
+            finally:
+                self.mailbox.task_done()
+    
+    def close(self):
+        """Stop the player and fail any commands still waiting with PlayerClosed."""
+        self.closed = True
+        self.task.cancel()
+        while not self.mailbox.empty():
+            _, _, _, future = self.mailbox.get_nowait()
+            if future is not None and not future.done():
+                future.set_exception(PlayerClosed(f"Player for guild {self.guild_id} was closed"))
@@ -0,0 +1,82 @@
+"""
+Background pre-resolution of upcoming queue entries.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Tuple
+
+from .config import Config
+from .scheduler import ExtractionRequest, current_request
+from .tracing import current_trace
+from .track import Track
+
+logger = logging.getLogger(__name__)
+
+class Prefetcher:
+    """Resolves the next queued tracks for each guild while a song plays.
+    
+    `refresh` re-resolves a track in place and must accept the minimum number
+    of seconds its stream URL has to stay valid. Prefetch extractions are
+    background jobs for the extraction scheduler, so they never crowd out
+    interactive plays. Each guild has at most one run; scheduling again
+    only replaces the tracks it has left, since a refresh already running
+    in a worker process can't be stopped and restarting it would extract
+    the same track twice.
+    """
+    
+    def __init__(self, refresh: Callable[[Track, float], Awaitable[bool]], *, depth: Optional[int] = None):
+        self.refresh = refresh
+        self.depth = depth if depth is not None else Config.PREFETCH_DEPTH
+        self.tasks: Dict[int, asyncio.Task] = {}
+        # Tracks each guild's run has left to resolve, with when each is expected to start
+        self.pending: Dict[int, Deque[Tuple[Track, float]]] = {}
+    
+    def schedule(self, guild_id: int, upcoming: List[Track], starts_in: float = 0):
+        """Prefetch a guild's upcoming tracks, handing them to its run if one is going."""
+        starts_at = time.monotonic() + starts_in
+        work = deque()
+        for track in upcoming[:self.depth]:
+            work.append((track, starts_at))
+            starts_at += track.duration or 0
+        if guild_id in self.tasks:
+            self.pending[guild_id] = work
+        elif work:
+            self.pending[guild_id] = work
+            self.tasks[guild_id] = asyncio.create_task(self._run(guild_id))
+    
+    def cancel(self, guild_id: int):
+        """Stop prefetching for a guild."""
+        self.pending.pop(guild_id, None)
+        task = self.tasks.pop(guild_id, None)
+        if task:
+            task.cancel()
+    
+    def close(self):
+        """Stop prefetching for every guild."""
+        for guild_id in list(self.tasks):
+            self.cancel(guild_id)
+    
+    async def _run(self, guild_id: int):
+        """Resolve a guild's pending tracks in play order, skipping those that are still valid."""
+        # The task inherited the scheduling command's context; prefetches belong to neither its trace nor its user
+        current_trace.set(None)
+        current_request.set(ExtractionRequest(guild_id, interactive=False))
+        try:
+            # Read the list afresh after every track, as scheduling may have replaced it
+            while self.pending.get(guild_id):
+                track, starts_at = self.pending[guild_id].popleft()
+                # The stream URL must outlive the wait until the track starts
+                margin = max(starts_at - time.monotonic(), 0) + Config.STREAM_URL_MARGIN
+                if not track.stream_valid(margin) and not await self.refresh(track, margin):
+                    logger.warning(f"Prefetch failed for {track.query} in guild {guild_id}")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"Error prefetching for guild {guild_id}: {e}")
+        finally:
+            if self.tasks.get(guild_id) is asyncio.current_task():
+                del self.tasks[guild_id]
+                self.pending.pop(guild_id, None)
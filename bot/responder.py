@@ -0,0 +1,123 @@
+"""
+Replies for commands that run as both prefix and slash commands.
+
+Discord fails a slash command that isn't acknowledged within 3 seconds of
+being invoked. A responder answers the interaction if the command replies
+in time and otherwise defers it once the latency budget runs out, so later
+replies become edits and follow-ups. Prefix commands show the typing
+indicator instead. Time to first acknowledgement is recorded per command.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+import discord
+
+from .config import Config
+from .tracing import tracer
+
+logger = logging.getLogger(__name__)
+
+class Responder:
+    """Sends the replies of one command invocation, from a context or an interaction."""
+    
+    def __init__(self, ctx_or_interaction, utils, *, budget: Optional[float] = None):
+        self.target = ctx_or_interaction
+        self.utils = utils
+        if isinstance(ctx_or_interaction, discord.Interaction):
+            self.interaction: Optional[discord.Interaction] = ctx_or_interaction
+            self.user = ctx_or_interaction.user
+            self.created_at = ctx_or_interaction.created_at
+            command = ctx_or_interaction.command
+            # Component interactions, e.g. picking a search result, have no command
+            self.name = f"slash.{command.qualified_name}" if command else ctx_or_interaction.type.name
+        else:
+            self.interaction = None
+            self.user = ctx_or_interaction.author
+            self.created_at = ctx_or_interaction.message.created_at
+            command = ctx_or_interaction.command
+            self.name = f"prefix.{command.qualified_name if command else 'unknown'}"
+        self.guild = ctx_or_interaction.guild
+        # Last message sent, which `edit` replaces
+        self.message: Optional[discord.Message] = None
+        self.acknowledged = False
+        self.deferred = False
+        self.replied = False
+        self._lock = asyncio.Lock()
+        
+        budget = budget if budget is not None else Config.RESPONSE_DEFER_AFTER
+        self._timer = asyncio.get_running_loop().call_later(
+            max(budget - self.elapsed, 0), lambda: asyncio.ensure_future(self.defer())
+        )
+    
+    @property
+    def elapsed(self) -> float:
+        """Seconds since the command was invoked."""
+        return (discord.utils.utcnow() - self.created_at).total_seconds()
+    
+    def _acknowledge(self):
+        """Record the time to first acknowledgement, once."""
+        if not self.acknowledged:
+            self.acknowledged = True
+            self._timer.cancel()
+            tracer.observe(f"ack.{self.name}", self.elapsed)
+    
+    async def defer(self):
+        """Acknowledge the command now and reply later; does nothing once it was acknowledged."""
+        async with self._lock:
+            if self.acknowledged:
+                return
+            try:
+                if self.interaction:
+                    if not self.interaction.response.is_done():
+                        await self.interaction.response.defer(thinking=True)
+                    self.deferred = True
+                else:
+                    await self.target.typing()
+            except discord.HTTPException as e:
+                logger.warning(f"Could not defer {self.name}: {e}")
+                return
+            self._acknowledge()
+    
+    async def send(self, content: Optional[str] = None, *, embed: Optional[discord.Embed] = None,
+                   view: Optional[discord.ui.View] = None) -> Optional[discord.Message]:
+        """Send a reply.
+        
+        An interaction is answered by its first reply, or by replacing the
+        "thinking" state if it was deferred; later replies are follow-ups.
+        Returns the message when sending already produced one.
+        """
+        kwargs = {'view': view} if view else {}
+        async with self._lock:
+            if not self.interaction:
+                self.message = await self.utils.safe_send(self.target, content=content, embed=embed, **kwargs)
+            elif self.deferred and not self.replied:
+                self.message = await self.interaction.edit_original_response(content=content, embed=embed, **kwargs)
+            elif not self.interaction.response.is_done():
+                await self.interaction.response.send_message(content=content, embed=embed, **kwargs)
+                # The original response; `edit` goes through the interaction
+                self.message = None
+            else:
+                self.message = await self.interaction.followup.send(content=content, embed=embed, wait=True, **kwargs)
+            self.replied = True
+            self._acknowledge()
+            return self.message
+    
+    async def edit(self, content: Optional[str] = None, *, embed: Optional[discord.Embed] = None,
+                   view: Optional[discord.ui.View] = None):
+        """Replace the last reply, or send one if there is none yet."""
+        if not self.replied:
+            await self.send(content, embed=embed, view=view)
+            return
+        
+        kwargs = {'content': content} if content is not None else {}
+        if view:
+            kwargs['view'] = view
+        try:
+            if self.message is not None:
+                await self.message.edit(embed=embed, **kwargs)
+            elif self.interaction:
+                await self.interaction.edit_original_response(embed=embed, **kwargs)
+        except discord.HTTPException as e:
+            logger.error(f"Error editing reply to {self.name}: {e}")
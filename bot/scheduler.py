@@ -0,0 +1,191 @@
+"""
+Fair admission control for extraction jobs.
+
+Jobs wait here before they reach the extraction workers. A job starts once
+a worker is free, its guild and user are under their quotas and it is its
+guild's turn: guilds with waiting jobs take turns in weighted round-robin,
+and interactive jobs always go before background work such as prefetches
+and autocomplete searches.
+"""
+
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Callable, Dict, NamedTuple, Optional
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+class ExtractionRequest(NamedTuple):
+    """Who an extraction is done for.
+    
+    Background requests usually leave out `user_id`, so they don't count
+    against the user's quota.
+    """
+    guild_id: Optional[int] = None
+    user_id: Optional[int] = None
+    interactive: bool = True
+
+# Requester of the extractions the current task starts
+current_request: ContextVar[ExtractionRequest] = ContextVar('current_request', default=ExtractionRequest())
+
+def guild_weight(guild_id: Optional[int]) -> int:
+    """Turns a guild gets in a row; owner guilds get more."""
+    return Config.EXTRACTION_OWNER_WEIGHT if guild_id in Config.OWNER_GUILDS else 1
+
+class _Waiter:
+    __slots__ = ('request', 'future')
+    
+    def __init__(self, request: ExtractionRequest, future: asyncio.Future):
+        self.request = request
+        self.future = future
+
+class ExtractionScheduler:
+    """Hands out `concurrency` extraction slots fairly between guilds and users.
+    
+    A waiter whose task is cancelled, e.g. because its command was abandoned
+    or its guild stopped playing, leaves the line without taking a slot.
+    """
+    
+    def __init__(self, concurrency: int, *, guild_limit: Optional[int] = None, user_limit: Optional[int] = None,
+                 background_limit: Optional[int] = None, weight: Callable[[Optional[int]], int] = guild_weight):
+        self.concurrency = concurrency
+        self.guild_limit = guild_limit or Config.EXTRACTION_GUILD_LIMIT
+        self.user_limit = user_limit or Config.EXTRACTION_USER_LIMIT
+        # Prefetches leave at least one slot free for interactive jobs
+        self.background_limit = max(1, min(background_limit or Config.PREFETCH_CONCURRENCY, concurrency - 1))
+        self.weight = weight
+        # Waiting jobs by guild, and the guilds with waiting jobs in turn order
+        self.waiting: Dict[Optional[int], deque] = {}
+        self.turns: deque = deque()
+        # Jobs the guild at the head of `turns` may still start this turn
+        self.credits: Dict[Optional[int], int] = {}
+        self.running = 0
+        self.running_background = 0
+        self.by_guild: Dict[Optional[int], int] = {}
+        self.by_user: Dict[int, int] = {}
+        self.cancelled = 0
+    
+    def queued(self, guild_id: Optional[int], interactive: bool = True) -> int:
+        """Number of interactive or background jobs a guild has waiting."""
+        return sum(1 for waiter in self.waiting.get(guild_id, ()) if waiter.request.interactive == interactive)
+    
+    @property
+    def waiters(self) -> int:
+        """Number of jobs waiting across all guilds."""
+        return sum(len(queue) for queue in self.waiting.values())
+    
+    @asynccontextmanager
+    async def slot(self, request: Optional[ExtractionRequest] = None) -> AsyncIterator[None]:
+        """Wait for a slot for the current task's requester and hold it for the block."""
+        request = request or current_request.get()
+        await self._acquire(request)
+        try:
+            yield
+        finally:
+            self._release(request)
+    
+    async def _acquire(self, request: ExtractionRequest):
+        """Get in line and wait for a slot."""
+        waiter = _Waiter(request, asyncio.get_running_loop().create_future())
+        queue = self.waiting.get(request.guild_id)
+        if queue is None:
+            queue = self.waiting[request.guild_id] = deque()
+            self.turns.append(request.guild_id)
+        queue.append(waiter)
+        self._dispatch()
+        
+        try:
+            await waiter.future
+        except asyncio.CancelledError:
+            if waiter.future.done() and not waiter.future.cancelled():
+                # The slot was granted just as the job was abandoned
+                self._release(request)
+            else:
+                self._remove(waiter)
+            self.cancelled += 1
+            raise
+    
+    def _dispatch(self):
+        """Start waiting jobs while slots are free, interactive ones first."""
+        for interactive in (True, False):
+            while self.running < self.concurrency:
+                waiter = self._next(interactive)
+                if waiter is None:
+                    break
+                self._start(waiter.request)
+                waiter.future.set_result(None)
+    
+    def _next(self, interactive: bool) -> Optional[_Waiter]:
+        """Take the next job allowed to start, going round the guilds in turn."""
+        for _ in range(len(self.turns)):
+            guild_id = self.turns[0]
+            queue = self.waiting[guild_id]
+            waiter = self._eligible(guild_id, queue, interactive)
+            if waiter is None:
+                self.credits.pop(guild_id, None)
+                self.turns.rotate(-1)
+                continue
+            
+            queue.remove(waiter)
+            credits = self.credits.pop(guild_id, self.weight(guild_id)) - 1
+            if not queue:
+                del self.waiting[guild_id]
+                self.turns.popleft()
+            elif credits > 0:
+                self.credits[guild_id] = credits
+            else:
+                self.turns.rotate(-1)
+            return waiter
+        return None
+    
+    def _eligible(self, guild_id: Optional[int], queue: deque, interactive: bool) -> Optional[_Waiter]:
+        """Get a guild's oldest job of the given kind that is within the quotas."""
+        if self.by_guild.get(guild_id, 0) >= self.guild_limit:
+            return None
+        if not interactive and self.running_background >= self.background_limit:
+            return None
+        for waiter in queue:
+            request = waiter.request
+            if request.interactive != interactive:
+                continue
+            if request.user_id is None or self.by_user.get(request.user_id, 0) < self.user_limit:
+                return waiter
+        return None
+    
+    def _remove(self, waiter: _Waiter):
+        """Take an abandoned job out of the line."""
+        guild_id = waiter.request.guild_id
+        queue = self.waiting.get(guild_id)
+        if queue is None or waiter not in queue:
+            return
+        queue.remove(waiter)
+        if not queue:
+            del self.waiting[guild_id]
+            self.turns.remove(guild_id)
+            self.credits.pop(guild_id, None)
+    
+    def _start(self, request: ExtractionRequest):
+        self.running += 1
+        self.by_guild[request.guild_id] = self.by_guild.get(request.guild_id, 0) + 1
+        if request.user_id is not None:
+            self.by_user[request.user_id] = self.by_user.get(request.user_id, 0) + 1
+        if not request.interactive:
+            self.running_background += 1
+    
+    def _release(self, request: ExtractionRequest):
+        """Free a slot and hand it to the next job in line."""
+        self.running -= 1
+        self.by_guild[request.guild_id] -= 1
+        if not self.by_guild[request.guild_id]:
+            del self.by_guild[request.guild_id]
+        if request.user_id is not None:
+            self.by_user[request.user_id] -= 1
+            if not self.by_user[request.user_id]:
+                del self.by_user[request.user_id]
+        if not request.interactive:
+            self.running_background -= 1
+        self._dispatch()
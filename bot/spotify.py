@@ -0,0 +1,181 @@
+"""
+Spotify catalog lookups for the music module.
+
+spotipy is blocking, so every call runs on a small dedicated thread pool
+rather than the event loop's default executor. Collections are fetched in
+bulk pages instead of one request per track.
+"""
+
+import asyncio
+import logging
+import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+# Spotify object kinds the music module can play
+SPOTIFY_KINDS = ('track', 'album', 'playlist', 'artist')
+
+# Fields requested for playlist items, to keep responses small
+PLAYLIST_FIELDS = 'next,items(track(type,id,name,duration_ms,artists(name),album(name),external_ids,external_urls))'
+
+def parse_spotify_url(url: str) -> Optional[Tuple[str, str]]:
+    """Get the (kind, id) of a Spotify URL or URI, e.g. ('playlist', '37i9...')."""
+    url = url.strip()
+    if url.startswith('spotify:'):
+        parts = url.split(':')
+    elif 'open.spotify.com' in url:
+        parts = [part for part in urlparse(url).path.split('/') if part and not part.startswith('intl-')]
+        parts.insert(0, 'spotify')
+    else:
+        return None
+    
+    if len(parts) < 3 or parts[1] not in SPOTIFY_KINDS or not parts[2]:
+        return None
+    return parts[1], parts[2]
+
+# Version words that make a video a different recording unless the track has them too
+VERSION_WORDS = {'live', 'cover', 'remix', 'karaoke', 'instrumental', 'acoustic', 'sped', 'slowed', 'nightcore', 'reverb'}
+
+def _words(text: str) -> set:
+    return set(re.findall(r'\w+', text.lower()))
+
+def score_match(info: Dict[str, Any], candidate: Dict[str, Any]) -> float:
+    """Score how well a YouTube search result matches a Spotify track, higher is better.
+    
+    Duration carries most of the weight, since one flat search result with the
+    right length is nearly always the right recording.
+    """
+    title = candidate.get('title') or ''
+    uploader = candidate.get('uploader') or ''
+    wanted = _words(info['name'])
+    found = _words(title)
+    
+    score = len(wanted & found) / max(len(wanted), 1)
+    if any(_words(artist) <= _words(f"{title} {uploader}") for artist in info.get('artists') or [info['artist']]):
+        score += 0.5
+    if uploader.endswith(' - Topic'):
+        # Auto-generated art tracks are the studio recording
+        score += 0.5
+    score -= 0.75 * len((found - wanted) & VERSION_WORDS)
+    
+    duration = candidate.get('duration')
+    if duration and info.get('duration'):
+        difference = abs(duration - info['duration'])
+        score += 2 * max(0.0, 1 - difference / Config.SPOTIFY_MATCH_TOLERANCE)
+        if difference > 3 * Config.SPOTIFY_MATCH_TOLERANCE:
+            score -= 2
+    return score
+
+def track_info(item: Dict[str, Any]) -> Dict[str, Any]:
+    """Compact the fields of a Spotify track object the music module uses."""
+    artists = [artist['name'] for artist in item.get('artists') or []]
+    return {
+        'id': item.get('id'),
+        'name': item['name'],
+        'artist': artists[0] if artists else '',
+        'artists': artists,
+        'album': (item.get('album') or {}).get('name'),
+        'duration': (item.get('duration_ms') or 0) // 1000,
+        'isrc': (item.get('external_ids') or {}).get('isrc'),
+        'external_url': (item.get('external_urls') or {}).get('spotify')
+    }
+
+class SpotifyCatalog:
+    """Async access to the Spotify Web API through a dedicated thread pool."""
+    
+    def __init__(self, client, *, workers: Optional[int] = None, max_tracks: Optional[int] = None):
+        self.client = client
+        self.workers = workers or Config.SPOTIFY_WORKERS
+        self.max_tracks = max_tracks or Config.PLAYLIST_MAX_TRACKS
+        self.requests = 0
+        # Tracks already fetched in bulk, so matching them later needs no request
+        self.known: 'OrderedDict[str, Dict[str, Any]]' = OrderedDict()
+        self._executor: Optional[ThreadPoolExecutor] = None
+    
+    async def _call(self, function: Callable[..., Any], *args: Any, **kwargs: Any) -> Any:
+        """Run a blocking spotipy call on the Spotify threads."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='spotify')
+        self.requests += 1
+        return await asyncio.get_running_loop().run_in_executor(self._executor, lambda: function(*args, **kwargs))
+    
+    def _remember(self, tracks: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Keep recently fetched tracks for later lookups."""
+        for info in tracks:
+            if info['id']:
+                self.known[info['id']] = info
+                self.known.move_to_end(info['id'])
+        while len(self.known) > Config.SPOTIFY_KNOWN_TRACKS:
+            self.known.popitem(last=False)
+        return tracks
+    
+    async def track(self, track_id: str) -> Dict[str, Any]:
+        """Look up a single track, without a request if it was fetched in bulk recently."""
+        info = self.known.get(track_id)
+        if info is None:
+            info = self._remember([track_info(await self._call(self.client.track, track_id))])[0]
+        return info
+    
+    async def pages(self, kind: str, item_id: str) -> AsyncIterator[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        """Yield the name of a track, album, playlist or artist and pages of its tracks."""
+        if kind == 'track':
+            yield None, [await self.track(item_id)]
+        elif kind == 'playlist':
+            async for name, tracks in self._playlist_pages(item_id):
+                yield name, self._remember(tracks)
+        elif kind == 'album':
+            async for name, tracks in self._album_pages(item_id):
+                yield name, self._remember(tracks)
+        elif kind == 'artist':
+            artist = await self._call(self.client.artist, item_id)
+            top = await self._call(self.client.artist_top_tracks, item_id)
+            yield f"{artist['name']} - Top Tracks", self._remember([track_info(item) for item in top['tracks']])
+    
+    async def _playlist_pages(self, playlist_id: str) -> AsyncIterator[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        """Page through a playlist 100 items per request."""
+        playlist = await self._call(self.client.playlist, playlist_id, fields='name')
+        offset = 0
+        while offset < self.max_tracks:
+            page = await self._call(
+                self.client.playlist_items, playlist_id, limit=100, offset=offset,
+                fields=PLAYLIST_FIELDS, additional_types=('track',)
+            )
+            items = page.get('items') or []
+            tracks = [
+                track_info(item['track']) for item in items
+                # Skip local files, podcast episodes and removed tracks
+                if item.get('track') and item['track'].get('type') == 'track' and item['track'].get('id')
+            ]
+            yield playlist.get('name'), tracks[:self.max_tracks - offset]
+            offset += len(items)
+            if not page.get('next') or not items:
+                return
+    
+    async def _album_pages(self, album_id: str) -> AsyncIterator[Tuple[Optional[str], List[Dict[str, Any]]]]:
+        """Page through an album, fetching full tracks 50 ids per request for their ISRCs."""
+        album = await self._call(self.client.album, album_id)
+        page = album['tracks']
+        offset = 0
+        while page and offset < self.max_tracks:
+            items = page.get('items') or []
+            ids = [item['id'] for item in items if item.get('id')]
+            if ids:
+                full = await self._call(self.client.tracks, ids[:50])
+                tracks = [track_info(item) for item in full['tracks'] if item]
+                yield album['name'], tracks[:self.max_tracks - offset]
+            offset += len(items)
+            if not page.get('next') or not items:
+                return
+            page = await self._call(self.client.album_tracks, album_id, limit=50, offset=offset)
+    
+    def close(self):
+        """Shut down the Spotify threads; they restart on the next call."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
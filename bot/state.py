@@ -0,0 +1,110 @@
+"""
+Persistent playback state for the music module.
+
+Each guild's queue, current track, position and settings are journaled to
+SQLite so a restart or redeploy can pick up where playback left off.
+"""
+
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+from .config import Config
+from .track import Track
+
+logger = logging.getLogger(__name__)
+
+def track_to_data(track: Track) -> Dict[str, Any]:
+    """Serialize a track, including the query it was requested with."""
+    return dict(track.to_data(), query=track.query)
+
+def track_from_data(data: Dict[str, Any]) -> Track:
+    """Rebuild a track serialized with `track_to_data`."""
+    data = dict(data)
+    return Track.from_data(data.pop('query', ''), data)
+
+class StateJournal:
+    """SQLite journal of per-guild player state.
+    
+    Player rows (voice channel, current track, position, settings) are small
+    and rewritten on every flush. Queue contents can be large, so they live in
+    their own table and are only rewritten when the queue changed.
+    """
+    
+    def __init__(self, path: Optional[str] = None):
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        
+        path = path or Config.STATE_PATH
+        try:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute('PRAGMA journal_mode=WAL')
+            self._db.execute('PRAGMA synchronous=NORMAL')
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS players ('
+                'guild_id INTEGER PRIMARY KEY, channel_id INTEGER NOT NULL, data TEXT NOT NULL, saved_at REAL NOT NULL)'
+            )
+            self._db.execute(
+                'CREATE TABLE IF NOT EXISTS queues (guild_id INTEGER PRIMARY KEY, tracks TEXT NOT NULL)'
+            )
+            self._db.commit()
+        except sqlite3.Error as e:
+            logger.warning(f"Playback state will not persist, could not open {path}: {e}")
+            self._db = None
+    
+    def load(self) -> Dict[int, Dict[str, Any]]:
+        """Load the saved state of every guild that was playing."""
+        if not self._db:
+            return {}
+        
+        with self._lock:
+            try:
+                rows = self._db.execute(
+                    'SELECT p.guild_id, p.channel_id, p.data, q.tracks FROM players p '
+                    'LEFT JOIN queues q ON q.guild_id = p.guild_id'
+                ).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Error reading playback state: {e}")
+                return {}
+        
+        states = {}
+        for guild_id, channel_id, data, tracks in rows:
+            try:
+                state = json.loads(data)
+                state['channel_id'] = channel_id
+                state['queue'] = json.loads(tracks) if tracks else []
+            except ValueError as e:
+                logger.error(f"Corrupt playback state for guild {guild_id}: {e}")
+                continue
+            states[guild_id] = state
+        return states
+    
+    def save(self, players: Dict[int, Dict[str, Any]], queues: Dict[int, List[Track]],
+             removed: Iterable[int] = ()):
+        """Write player rows, changed queues and removals in one transaction."""
+        if not self._db:
+            return
+        
+        saved_at = time.time()
+        player_rows = [
+            (guild_id, state['channel_id'], json.dumps({k: v for k, v in state.items() if k != 'channel_id'}), saved_at)
+            for guild_id, state in players.items()
+        ]
+        queue_rows = [
+            (guild_id, json.dumps([track_to_data(track) for track in tracks]))
+            for guild_id, tracks in queues.items()
+        ]
+        removed_rows = [(guild_id,) for guild_id in removed]
+        
+        with self._lock:
+            try:
+                with self._db:
+                    self._db.executemany('INSERT OR REPLACE INTO players VALUES (?, ?, ?, ?)', player_rows)
+                    self._db.executemany('INSERT OR REPLACE INTO queues VALUES (?, ?)', queue_rows)
+                    self._db.executemany('DELETE FROM players WHERE guild_id = ?', removed_rows)
+                    self._db.executemany('DELETE FROM queues WHERE guild_id = ?', removed_rows)
+            except sqlite3.Error as e:
+                logger.error(f"Error writing playback state: {e}")
@@ -0,0 +1,185 @@
+"""
+Search suggestions for the /play autocomplete.
+
+Suggestions come from a local prefix index of recently and frequently
+played titles first. When that has too few matches, a debounced flat search
+fills in, with results cached so repeated keystrokes cost nothing.
+"""
+
+import asyncio
+import bisect
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+def normalize_text(text: str) -> str:
+    """Lowercase and collapse whitespace for matching."""
+    return ' '.join(text.lower().split())
+
+class TitleIndex:
+    """Prefix index over played titles, ranked by play count and recency.
+    
+    Every word start of a title is indexed, so "gonna" finds "Never Gonna
+    Give You Up". Keys live in a sorted list searched with bisect.
+    """
+    
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = max_size or Config.SUGGEST_INDEX_SIZE
+        # value -> [title, plays, last played]
+        self.entries: Dict[str, List[Any]] = {}
+        # Sorted (suffix starting at a word, value)
+        self.keys: List[Tuple[str, str]] = []
+    
+    def __len__(self) -> int:
+        return len(self.entries)
+    
+    @staticmethod
+    def _suffixes(title: str) -> List[str]:
+        words = normalize_text(title).split(' ')
+        return [' '.join(words[i:]) for i in range(len(words))]
+    
+    def record(self, title: str, value: str):
+        """Count a play of a title; `value` is what the suggestion submits."""
+        if not title or not value:
+            return
+        
+        entry = self.entries.get(value)
+        if entry:
+            entry[1] += 1
+            entry[2] = time.time()
+            return
+        
+        if len(self.entries) >= self.max_size:
+            self._evict()
+        self.entries[value] = [title, 1, time.time()]
+        for suffix in self._suffixes(title):
+            bisect.insort(self.keys, (suffix, value))
+    
+    def _evict(self):
+        """Drop the lowest ranked entry."""
+        value = min(self.entries, key=lambda v: self._score(self.entries[v]))
+        title = self.entries.pop(value)[0]
+        for suffix in self._suffixes(title):
+            index = bisect.bisect_left(self.keys, (suffix, value))
+            if index < len(self.keys) and self.keys[index] == (suffix, value):
+                del self.keys[index]
+    
+    @staticmethod
+    def _score(entry: List[Any]) -> float:
+        # Plays count for a lot, recency breaks ties and fades over a week
+        age = time.time() - entry[2]
+        return entry[1] + max(0.0, 1 - age / 604800)
+    
+    def search(self, prefix: str, limit: int = 25) -> List[Tuple[str, str]]:
+        """Get (title, value) pairs with a word starting with `prefix`, best first."""
+        prefix = normalize_text(prefix)
+        if not prefix:
+            ranked = sorted(self.entries.items(), key=lambda item: self._score(item[1]), reverse=True)
+            return [(entry[0], value) for value, entry in ranked[:limit]]
+        
+        matches = {}
+        index = bisect.bisect_left(self.keys, (prefix, ''))
+        # Bound the scan; the index is only a fast first guess
+        while index < len(self.keys) and len(matches) < limit * 4:
+            suffix, value = self.keys[index]
+            if not suffix.startswith(prefix):
+                break
+            matches[value] = self.entries[value]
+            index += 1
+        
+        ranked = sorted(matches.items(), key=lambda item: self._score(item[1]), reverse=True)
+        return [(entry[0], value) for value, entry in ranked[:limit]]
+
+class Suggester:
+    """Answers autocomplete requests within a deadline.
+    
+    `search` runs a flat search and returns dicts with at least `title` and
+    `webpage_url`. Index matches are returned straight away; a search only
+    runs once the user stopped typing for `debounce` seconds, and never past
+    `deadline`. A search that misses the deadline keeps running in the
+    background so its results are cached for the next keystroke.
+    """
+    
+    def __init__(self, search: Callable[[str], Awaitable[List[Dict[str, Any]]]], index: TitleIndex, *,
+                 debounce: Optional[float] = None, deadline: Optional[float] = None,
+                 cache_ttl: Optional[float] = None, cache_size: int = 512):
+        self.search = search
+        self.index = index
+        self.debounce = debounce if debounce is not None else Config.SUGGEST_DEBOUNCE
+        self.deadline = deadline if deadline is not None else Config.SUGGEST_DEADLINE
+        self.cache_ttl = cache_ttl if cache_ttl is not None else Config.SUGGEST_CACHE_TTL
+        self.cache_size = cache_size
+        self.cache: 'OrderedDict[str, Tuple[List[Dict[str, Any]], float]]' = OrderedDict()
+        self.searches: Dict[str, asyncio.Task] = {}
+        # Latest text typed by each user, to debounce keystrokes
+        self.latest: Dict[int, str] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def _cached(self, key: str) -> Optional[List[Dict[str, Any]]]:
+        entry = self.cache.get(key)
+        if not entry or time.time() - entry[1] > self.cache_ttl:
+            return None
+        self.cache.move_to_end(key)
+        return entry[0]
+    
+    async def _search(self, key: str, text: str) -> List[Dict[str, Any]]:
+        """Run a flat search and cache the results."""
+        try:
+            results = await self.search(text)
+        except Exception as e:
+            logger.warning(f"Suggestion search failed for {text!r}: {e}")
+            return []
+        finally:
+            self.searches.pop(key, None)
+        
+        self.cache[key] = (results, time.time())
+        self.cache.move_to_end(key)
+        while len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+        return results
+    
+    async def suggest(self, user_id: int, text: str, limit: int = 25) -> List[Tuple[str, str]]:
+        """Get up to `limit` (title, value) suggestions for what a user typed.
+        
+        A flat search only runs when the index has fewer than
+        `Config.SUGGEST_RESULTS` matches.
+        """
+        started = time.monotonic()
+        suggestions = self.index.search(text, limit)
+        key = normalize_text(text)
+        if len(suggestions) >= min(limit, Config.SUGGEST_RESULTS) or len(key) < Config.SUGGEST_MIN_LENGTH or key.startswith(('http://', 'https://')):
+            return suggestions
+        
+        results = self._cached(key)
+        if results is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.latest[user_id] = key
+            await asyncio.sleep(self.debounce)
+            if self.latest.get(user_id) != key:
+                # A newer keystroke superseded this one
+                return suggestions
+            self.latest.pop(user_id, None)
+            
+            task = self.searches.get(key)
+            if task is None:
+                task = self.searches[key] = asyncio.create_task(self._search(key, text))
+            remaining = self.deadline - (time.monotonic() - started)
+            try:
+                results = await asyncio.wait_for(asyncio.shield(task), max(remaining, 0))
+            except asyncio.TimeoutError:
+                return suggestions
+        
+        seen = {value for _, value in suggestions}
+        for result in results:
+            if result.get('title') and result['webpage_url'] not in seen and len(suggestions) < limit:
+                suggestions.append((result['title'], result['webpage_url']))
+                seen.add(result['webpage_url'])
+        return suggestions
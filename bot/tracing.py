@@ -0,0 +1,173 @@
+"""
+Latency tracing for the play pipeline.
+
+A trace follows one play request through voice join, Spotify lookup,
+extraction, FFmpeg spawn and the first audio frame. Stage timings feed
+per-stage latency histograms, the slowest traces are kept as exemplars and
+every finished trace is appended to a size-bounded JSON-lines file.
+"""
+
+import heapq
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from .config import Config
+
+logger = logging.getLogger(__name__)
+
+class LatencyHistogram:
+    """Latency samples for one stage over a sliding window."""
+    
+    def __init__(self, size: int = 2048):
+        self.samples: deque = deque(maxlen=size)
+        self.count = 0
+    
+    def observe(self, seconds: float):
+        """Record one sample."""
+        self.samples.append(seconds)
+        self.count += 1
+    
+    def percentile(self, percent: float) -> float:
+        """Get a percentile of the samples in the window, in seconds."""
+        if not self.samples:
+            return 0.0
+        ordered = sorted(self.samples)
+        return ordered[min(int(len(ordered) * percent / 100), len(ordered) - 1)]
+
+class Trace:
+    """Timing of one request through the play pipeline."""
+    
+    def __init__(self, tracer: 'Tracer', name: str, **tags: Any):
+        self.tracer = tracer
+        self.name = name
+        self.tags = tags
+        self.started = time.perf_counter()
+        self.timestamp = time.time()
+        # (stage, offset from trace start, duration), in seconds
+        self.spans: List[Tuple[str, float, float]] = []
+        self.total: Optional[float] = None
+    
+    def record(self, stage: str, started: float, ended: Optional[float] = None):
+        """Record a stage that ran between two perf_counter timestamps."""
+        ended = ended if ended is not None else time.perf_counter()
+        self.spans.append((stage, started - self.started, ended - started))
+        self.tracer.observe(stage, ended - started)
+    
+    def finish(self, ended: Optional[float] = None):
+        """Close the trace and hand it to the tracer."""
+        if self.total is not None:
+            return
+        self.total = (ended if ended is not None else time.perf_counter()) - self.started
+        self.tracer.finish(self)
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'timestamp': self.timestamp,
+            'total_ms': round((self.total or 0) * 1000, 1),
+            'tags': self.tags,
+            'spans': [
+                {'stage': stage, 'offset_ms': round(offset * 1000, 1), 'duration_ms': round(duration * 1000, 1)}
+                for stage, offset, duration in self.spans
+            ]
+        }
+
+# Trace of the request the current task is working on
+current_trace: ContextVar[Optional[Trace]] = ContextVar('current_trace', default=None)
+
+class Tracer:
+    """Collects traces, per-stage histograms and the slowest exemplars."""
+    
+    def __init__(self, path: Optional[str] = None, exemplars: Optional[int] = None,
+                 max_bytes: Optional[int] = None):
+        self.path = path or Config.TRACE_LOG_PATH
+        self.exemplars = exemplars or Config.TRACE_EXEMPLARS
+        self.max_bytes = max_bytes or Config.TRACE_LOG_MAX_BYTES
+        # One writer thread keeps file I/O off the event loop and lines in order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix='trace-log')
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        # Min-heap of (total, sequence, trace) holding the slowest traces
+        self.slowest: List[Tuple[float, int, Trace]] = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+    
+    def start(self, name: str, **tags: Any) -> Trace:
+        """Start a trace and make it current for this task."""
+        trace = Trace(self, name, **tags)
+        current_trace.set(trace)
+        return trace
+    
+    def observe(self, stage: str, seconds: float):
+        """Record a latency sample for a stage."""
+        with self._lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = LatencyHistogram()
+            histogram.observe(seconds)
+    
+    def finish(self, trace: Trace):
+        """Store a finished trace."""
+        self.observe(f"{trace.name}.total", trace.total)
+        with self._lock:
+            self._sequence += 1
+            entry = (trace.total, self._sequence, trace)
+            if len(self.slowest) < self.exemplars:
+                heapq.heappush(self.slowest, entry)
+            elif trace.total > self.slowest[0][0]:
+                heapq.heapreplace(self.slowest, entry)
+        
+        self._writer.submit(self._write, json.dumps(trace.to_dict()) + '\n')
+    
+    def _write(self, line: str):
+        """Append a line to the trace log, rotating it once it is full; runs on the writer thread."""
+        try:
+            if os.path.exists(self.path) and os.path.getsize(self.path) >= self.max_bytes:
+                os.replace(self.path, self.path + '.1')
+            with open(self.path, 'a') as f:
+                f.write(line)
+        except OSError as e:
+            logger.error(f"Error writing trace log: {e}")
+    
+    def summary(self) -> Dict[str, Dict[str, float]]:
+        """Get count and p50/p95/p99 latency in milliseconds for every stage."""
+        with self._lock:
+            return {
+                stage: {
+                    'count': histogram.count,
+                    'p50': histogram.percentile(50) * 1000,
+                    'p95': histogram.percentile(95) * 1000,
+                    'p99': histogram.percentile(99) * 1000
+                }
+                for stage, histogram in sorted(self.histograms.items())
+            }
+    
+    def slowest_traces(self) -> List[Trace]:
+        """Get the exemplar traces, slowest first."""
+        with self._lock:
+            return [trace for _, _, trace in sorted(self.slowest, reverse=True)]
+
+tracer = Tracer()
+
+@contextmanager
+def span(stage: str) -> Iterator[None]:
+    """Time a block as a stage of the current trace.
+    
+    Without a current trace the sample still goes into the stage histogram.
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace = current_trace.get()
+        if trace is not None:
+            trace.record(stage, started)
+        else:
+            tracer.observe(stage, time.perf_counter() - started)
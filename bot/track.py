@@ -0,0 +1,107 @@
+"""
+Track descriptors for the music queue.
+"""
+
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+
+from .config import Config
+
+def stream_expiry(stream_url: Optional[str]) -> Optional[float]:
+    """Parse the expiry timestamp from a signed stream URL."""
+    if not stream_url:
+        return None
+    
+    parsed = urlparse(stream_url)
+    expire = parse_qs(parsed.query).get('expire')
+    if expire:
+        value = expire[0]
+    elif '/expire/' in parsed.path:
+        # Manifest style URLs carry their parameters in the path
+        value = parsed.path.split('/expire/')[1].split('/')[0]
+    else:
+        return time.time() + Config.STREAM_URL_TTL
+    
+    try:
+        return float(value)
+    except ValueError:
+        return time.time() + Config.STREAM_URL_TTL
+
+class Track:
+    """Lightweight description of a queued song.
+    
+    Holds only the resolved metadata and stream URL. The FFmpeg pipeline is
+    built from it right before playback, so queued tracks cost no processes.
+    Slots keep large imported queues small in memory.
+    """
+    
+    __slots__ = ('query', 'id', 'title', 'duration', 'uploader', 'thumbnail',
+                 'webpage_url', 'stream_url', 'expires_at', 'codec')
+    
+    def __init__(self, query: str, *, id: Optional[str] = None, title: Optional[str] = None,
+                 duration: Optional[int] = None, uploader: Optional[str] = None,
+                 thumbnail: Optional[str] = None, webpage_url: Optional[str] = None,
+                 stream_url: Optional[str] = None, expires_at: Optional[float] = None,
+                 codec: Optional[str] = None):
+        self.query = query
+        self.id = id
+        self.title = title
+        self.duration = duration
+        self.uploader = uploader
+        self.thumbnail = thumbnail
+        self.webpage_url = webpage_url
+        self.stream_url = stream_url
+        self.expires_at = expires_at if expires_at is not None else stream_expiry(stream_url)
+        self.codec = codec
+    
+    @classmethod
+    def from_data(cls, query: str, data: Dict[str, Any]) -> 'Track':
+        """Build a track from a youtube-dl info dict."""
+        return cls(
+            query,
+            id=data.get('id'),
+            title=data.get('title'),
+            duration=data.get('duration'),
+            uploader=data.get('uploader'),
+            thumbnail=data.get('thumbnail'),
+            webpage_url=data.get('webpage_url'),
+            stream_url=data.get('url'),
+            expires_at=data.get('expires_at'),
+            codec=data.get('acodec')
+        )
+    
+    def to_data(self) -> Dict[str, Any]:
+        """Return the track as a compact info dict."""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'duration': self.duration,
+            'uploader': self.uploader,
+            'thumbnail': self.thumbnail,
+            'webpage_url': self.webpage_url,
+            'url': self.stream_url,
+            'expires_at': self.expires_at,
+            'acodec': self.codec
+        }
+    
+    def update(self, other: 'Track'):
+        """Take over the resolved metadata and stream URL of another track."""
+        self.id = other.id
+        self.title = other.title
+        self.duration = other.duration
+        self.uploader = other.uploader
+        self.thumbnail = other.thumbnail
+        self.webpage_url = other.webpage_url
+        self.stream_url = other.stream_url
+        self.expires_at = other.expires_at
+        self.codec = other.codec
+    
+    def stream_valid(self, margin: float = 0) -> bool:
+        """Check if the stream URL is usable for at least `margin` more seconds."""
+        if not self.stream_url:
+            return False
+        return self.expires_at is None or self.expires_at - margin > time.time()
+    
+    def __repr__(self) -> str:
+        return f"<Track id={self.id!r} title={self.title!r}>"
@@ -30,10 +30,10 @@ class Utils:
         """Check if user is protected (is the owner)."""
         return Config.is_owner(user.id)
     
-    async def safe_send(self, ctx, content=None, embed=None):
+    async def safe_send(self, ctx, content=None, embed=None, view=None):
         """Safely send a message with error handling."""
         try:
-            return await ctx.send(content=content, embed=embed)
+            return await ctx.send(content=content, embed=embed, view=view)
         except discord.Forbidden:
             logger.warning(f"Missing permissions to send message in {ctx.guild.name}")
         except discord.HTTPException as e:
@@ -66,6 +66,21 @@ class Utils:
         seconds = seconds % 60
         return f"{minutes:02d}:{seconds:02d}"
     
+    def parse_duration(self, text: str) -> Optional[int]:
+        """Parse a duration in seconds, MM:SS or HH:MM:SS format to seconds."""
+        try:
+            parts = [int(part) for part in text.strip().split(':')]
+        except ValueError:
+            return None
+        
+        if not 1 <= len(parts) <= 3 or any(part < 0 for part in parts):
+            return None
+        
+        seconds = 0
+        for part in parts:
+            seconds = seconds * 60 + part
+        return seconds
+    
     async def log_action(self, guild: discord.Guild, action: str, moderator: discord.User, 
                         target: discord.User = None, reason: str = None):
         """Log moderation actions."""
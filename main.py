@@ -7,6 +7,7 @@ A Discord bot with music, moderation, and owner privilege features.
 import os
 import asyncio
 import logging
+import signal
 from dotenv import load_dotenv
 import discord
 from discord.ext import commands
@@ -21,15 +22,6 @@ from bot.moderation import Moderation
 from bot.owner import Owner
 from bot.utils import Utils
 
-# Set up logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.FileHandler('bot.log'),
-        logging.StreamHandler()
-    ]
-)
 logger = logging.getLogger(__name__)
 
 class MultiPurposeBot(commands.Bot):
@@ -152,13 +144,18 @@ async def help_command(ctx, category=None):
         
         commands_list = [
             f"`{Config.PREFIX}play <song>` - Play a song or add to queue",
+            f"`{Config.PREFIX}search <query>` - Pick a song from search results",
             f"`{Config.PREFIX}pause` - Pause current song",
             f"`{Config.PREFIX}resume` - Resume paused song",
             f"`{Config.PREFIX}stop` - Stop music and clear queue",
             f"`{Config.PREFIX}skip` - Skip current song",
             f"`{Config.PREFIX}queue` - Show current queue",
             f"`{Config.PREFIX}np` - Show now playing",
+            f"`{Config.PREFIX}seek <time>` - Seek in current song",
+            f"`{Config.PREFIX}forward [seconds]` - Skip forward",
+            f"`{Config.PREFIX}rewind [seconds]` - Rewind",
             f"`{Config.PREFIX}volume <1-100>` - Set volume",
+            f"`{Config.PREFIX}eq <bass> <mid> <treble>` - Set equalizer (dB)",
             f"`{Config.PREFIX}join` - Join voice channel",
             f"`{Config.PREFIX}leave` - Leave voice channel"
         ]
@@ -207,6 +204,8 @@ async def help_command(ctx, category=None):
                 f"`{Config.PREFIX}gmute <user> [reason]` - Globally mute user",
                 f"`{Config.PREFIX}leaveserver <server_id>` - Leave a server",
                 f"`{Config.PREFIX}servers` - List all servers",
+                f"`{Config.PREFIX}latency` - Show play latency stats",
+                f"`{Config.PREFIX}resources` - Show live voice and audio resources",
                 f"`{Config.PREFIX}shutdown` - Shutdown the bot"
             ]
             
@@ -226,6 +225,12 @@ async def main():
     bot = MultiPurposeBot()
     bot.add_command(help_command)
     
+    # Shut down cleanly on redeploys so playback state is saved
+    try:
+        asyncio.get_running_loop().add_signal_handler(signal.SIGTERM, lambda: asyncio.create_task(bot.close()))
+    except NotImplementedError:
+        pass
+    
     try:
         await bot.start(Config.TOKEN)
     except discord.LoginFailure:
@@ -234,4 +239,13 @@ async def main():
         logger.error(f"Error starting bot: {e}")
 
 if __name__ == "__main__":
+    # Set up logging here, not on import: extraction worker processes import this module too
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
+        handlers=[
+            logging.FileHandler('bot.log'),
+            logging.StreamHandler()
+        ]
+    )
     asyncio.run(main())